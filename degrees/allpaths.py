@@ -0,0 +1,100 @@
+"""
+Every shortest path between two people, from a single BFS.
+
+`parent_dag` runs one BFS that records, for each person, every
+(movie_id, parent) step that reaches them from the previous layer, and
+stops once the target's layer is complete. The shortest paths are then
+exactly the walks from the target back to the source through that DAG,
+which `enumerate_paths` and `ranked_paths` generate lazily.
+"""
+
+import heapq
+import itertools
+
+
+def parent_dag(source, target, neighbors):
+    """
+    Returns {person_id: [(movie_id, parent), ...]} for every person
+    reached before or in the target's layer, in BFS order, or None if
+    `target` cannot be reached. `neighbors` computes a person's
+    (movie_id, person_id) neighbors.
+    """
+    parents = {source: []}
+    layer = [source]
+    while layer and target not in parents:
+        reached = {}
+        for person_id in layer:
+            for movie_id, neighbor in neighbors(person_id):
+                if neighbor in parents:
+                    continue
+                reached.setdefault(neighbor, []).append((movie_id, person_id))
+        parents.update(reached)
+        layer = list(reached)
+    if target not in parents:
+        return None
+    return parents
+
+
+def enumerate_paths(dag, source, target):
+    """
+    Yields every source -> target path of `dag` as a list of
+    (movie_id, person_id) pairs, holding one path in memory at a time.
+    """
+    if source == target:
+        yield []
+        return
+    # Depth-first from the target, one parent iterator per level
+    steps = []
+    stack = [iter(dag[target])]
+    person_id = target
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            if steps:
+                _, person_id = steps.pop()
+            continue
+        movie_id, parent = step
+        steps.append((movie_id, person_id))
+        if parent == source:
+            yield steps[::-1]
+            steps.pop()
+        else:
+            stack.append(iter(dag[parent]))
+            person_id = parent
+
+
+def ranked_paths(dag, source, target, weight):
+    """
+    Yields the source -> target paths of `dag` in increasing order of
+    total `weight(movie_id)`, lazily: producing the k-th path only costs
+    work proportional to the paths ranked before it.
+    """
+    if source == target:
+        yield []
+        return
+
+    # Cheapest remaining cost from each person back to the source; the
+    # DAG lists people layer by layer, so parents are settled first
+    best = {}
+    for person_id, steps in dag.items():
+        if person_id == source:
+            best[person_id] = 0
+        else:
+            best[person_id] = min(weight(movie_id) + best[parent] for movie_id, parent in steps)
+
+    # A* over partial paths from the target; `best` makes the estimate exact
+    counter = itertools.count()
+    heap = [(best[target], next(counter), 0, target, ())]
+    while heap:
+        _, _, cost, person_id, steps = heapq.heappop(heap)
+        if person_id == source:
+            yield list(reversed(steps))
+            continue
+        for movie_id, parent in dag[person_id]:
+            step_cost = cost + weight(movie_id)
+            heapq.heappush(heap, (
+                step_cost + best[parent], next(counter), step_cost, parent,
+                steps + ((movie_id, person_id),)
+            ))
+
@@ -0,0 +1,227 @@
+"""
+Benchmark harness for degrees over synthetic scale-free datasets.
+
+    python benchmark.py generate DIR [--people N] [--movies M] [--seed S]
+    python benchmark.py run DIR [--queries Q] [--mode MODE] [degrees options]
+
+`generate` writes people.csv, movies.csv and stars.csv in the format of
+the bundled datasets. Cast sizes follow a power law, and cast members
+are drawn with power-law popularity, so a few people appear in many
+movies like real stars do.
+
+`run` loads DIR with the given degrees options (--compact, --landmarks,
+...), sends a fixed random workload of queries through shortest_path
+and reports load time, p50/p99 query latency, people expanded and peak
+RSS. Queries answered by the path cache or the component index are
+counted apart and left out of the expanded figures, and queries that
+raise are counted as errors rather than as unconnected. The workload only depends on DIR, --queries and --seed, so runs
+with different options are directly comparable. Use one process per
+configuration, since peak RSS covers the whole process.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+import degrees
+
+FIRST_NAMES = (
+    "Alex", "Ana", "Ben", "Carla", "Chris", "Dana", "Eli", "Emma", "Frank", "Grace",
+    "Hugo", "Ines", "Jack", "Julia", "Kevin", "Laura", "Leo", "Maria", "Nina", "Omar",
+    "Paul", "Rosa", "Sam", "Sofia", "Tom", "Vera"
+)
+LAST_NAMES = (
+    "Bacon", "Brown", "Cruise", "Diaz", "Evans", "Garcia", "Hanks", "Ito", "Jones",
+    "Kim", "Lopez", "Martin", "Nolan", "Perez", "Quinn", "Rossi", "Smith", "Stone",
+    "Taylor", "Wang", "Watson", "Young"
+)
+
+
+def generate(directory, people=10000, movies=2000, cast_exponent=2.0,
+             popularity_exponent=0.8, max_cast=200, seed=0):
+    """
+    Writes a synthetic dataset to `directory`.
+
+    Cast sizes are drawn from a Pareto distribution with shape
+    `cast_exponent - 1` (at least 2 stars, at most `max_cast`), and person i
+    is picked for a cast with weight 1 / (i + 1) ** `popularity_exponent`.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        f.write("id,name,birth\n")
+        for i in range(people):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            writer.writerow([str(i + 1), name, str(rng.randint(1920, 2010))])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        f.write("id,title,year\n")
+        for i in range(movies):
+            writer.writerow([str(i + 1), f"Movie {i + 1}", str(rng.randint(1950, 2025))])
+
+    cumulative = []
+    total = 0.0
+    for i in range(people):
+        total += 1 / (i + 1) ** popularity_exponent
+        cumulative.append(total)
+    # Shuffle popularity so that ids carry no information
+    ranking = list(range(1, people + 1))
+    rng.shuffle(ranking)
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        f.write("person_id,movie_id\n")
+        for movie_id in range(1, movies + 1):
+            size = min(max_cast, people, int(2 * rng.paretovariate(cast_exponent - 1)))
+            cast = set()
+            while len(cast) < size:
+                cast.update(rng.choices(ranking, cum_weights=cumulative, k=size - len(cast)))
+            for person_id in sorted(cast):
+                f.write(f"{person_id},{movie_id}\n")
+
+
+def workload(directory, queries, seed=0):
+    """
+    Returns `queries` random (source, target) person_id pairs for the
+    dataset in `directory`, read straight from people.csv.
+    """
+    with open(os.path.join(directory, "people.csv"), encoding="utf-8") as f:
+        person_ids = [row["id"] for row in csv.DictReader(f)]
+    rng = random.Random(seed)
+    return [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(queries)]
+
+
+def run(args, pairs):
+    """
+    Loads the dataset as configured by `args`, answers `pairs` and
+    returns the measurements.
+    """
+    start = time.perf_counter()
+    degrees.setup(args)
+    load_time = time.perf_counter() - start
+
+    latencies = []
+    expanded = []
+    connected = 0
+    skipped = 0
+    cached = 0
+    by_components = 0
+    errors = 0
+    first_error = None
+    for source, target in pairs:
+        if source not in degrees.people or target not in degrees.people:
+            skipped += 1
+            continue
+        answered = None if degrees.components is None else degrees.components.answered
+        start = time.perf_counter()
+        try:
+            path = degrees.shortest_path(source, target, mode=args.mode)
+        except Exception as e:
+            errors += 1
+            if first_error is None:
+                first_error = f"{type(e).__name__}: {e}"
+            continue
+        latencies.append(time.perf_counter() - start)
+        if path is not None:
+            connected += 1
+        searched = degrees.last_search
+        if searched is None:
+            cached += 1
+        elif answered is not None and degrees.components.answered > answered:
+            by_components += 1
+        else:
+            expanded.append(searched.expanded)
+
+    latencies.sort()
+    return {
+        "load_time": load_time,
+        "queries": len(latencies) + errors,
+        "skipped": skipped,
+        "errors": errors,
+        "first_error": first_error,
+        "connected": connected,
+        "cached": cached,
+        "components": by_components,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "searches": len(expanded),
+        "mean_expanded": sum(expanded) / len(expanded) if expanded else 0.0,
+        "max_expanded": max(expanded, default=0),
+        "peak_rss": peak_rss()
+    }
+
+
+def percentile(values, p):
+    """
+    Returns the `p`-th percentile of sorted `values` (nearest rank).
+    """
+    if not values:
+        return 0.0
+    rank = max(1, -(-p * len(values) // 100))
+    return values[int(rank) - 1]
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python benchmark.py {generate,run} DIR [options]")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="write a synthetic dataset")
+    generate_parser.add_argument("directory")
+    generate_parser.add_argument("--people", type=int, default=10000)
+    generate_parser.add_argument("--movies", type=int, default=2000)
+    generate_parser.add_argument("--cast-exponent", type=float, default=2.0)
+    generate_parser.add_argument("--popularity-exponent", type=float, default=0.8)
+    generate_parser.add_argument("--max-cast", type=int, default=200)
+    generate_parser.add_argument("--seed", type=int, default=0)
+
+    run_parser = commands.add_parser("run", help="time a query workload")
+    degrees.add_arguments(run_parser)
+    run_parser.add_argument("--mode", choices=degrees.SEARCH_MODES, default="bfs")
+    run_parser.add_argument("--queries", type=int, default=200)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--json", action="store_true", help="print the results as JSON")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.directory, args.people, args.movies, args.cast_exponent,
+                 args.popularity_exponent, args.max_cast, args.seed)
+        return
+
+    pairs = workload(args.directory, args.queries, args.seed)
+    results = run(args, pairs)
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"Load:     {results['load_time']:.2f} s")
+    print(f"Queries:  {results['queries']} ({results['connected']} connected, "
+          f"{results['skipped']} skipped, {results['errors']} errors)")
+    if results["errors"]:
+        print(f"Errors:   first was {results['first_error']}")
+    print(f"Answered: {results['cached']} from the path cache, "
+          f"{results['components']} by the component index")
+    print(f"Latency:  p50 {results['p50'] * 1000:.3f} ms, p99 {results['p99'] * 1000:.3f} ms")
+    print(f"Expanded: mean {results['mean_expanded']:.1f}, max {results['max_expanded']} "
+          f"(over {results['searches']} searches)")
+    print(f"Peak RSS: {results['peak_rss'] / 2**20:.1f} MiB")
+    for line in degrees.report():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
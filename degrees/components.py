@@ -0,0 +1,161 @@
+"""
+Connected-component index for degrees.
+
+A union-find over people, built in one pass over the movie casts, tells
+in (amortized) constant time whether two people are connected at all,
+so shortest_path can answer "not connected" without exploring the
+source's whole component.
+
+Links can be added later (components merge); removing a link might
+split a component, which union-find cannot undo, so the component is
+marked dirty and answers for it fall back to searching until the index
+is rebuilt.
+"""
+
+import array
+import collections
+
+
+class ComponentIndex():
+    """
+    Union-find over person positions. `position(person_id)` maps a
+    person to its position, or None for unknown people.
+    """
+
+    def __init__(self, count, position, casts):
+        """
+        `count` is the number of people and `casts` yields, for every
+        movie, the positions of its stars.
+        """
+        self.position = position
+        self.parent = array.array("i", range(count))
+        self.size = array.array("i", [1]) * count
+        self.dirty = set()
+        for cast in casts:
+            first = None
+            for p in cast:
+                if first is None:
+                    first = p
+                else:
+                    self._union(first, p)
+        self.answered = 0
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        index = {person_id: i for i, person_id in enumerate(people)}
+        casts = (
+            [index[person_id] for person_id in movie["stars"]]
+            for movie in movies.values()
+        )
+        component_index = cls(len(index), index.get, casts)
+        component_index.index = index
+        return component_index
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Builds the index of a compact Graph, from its `component_labels`
+        when it has them (as snapshots do) and from its casts otherwise.
+        """
+        if graph.component_labels is not None:
+            return cls.from_labels(graph.component_labels, graph.person_index)
+        casts = (graph.stars_of(m) for m in range(graph.num_movies))
+        return cls(graph.num_people, graph.person_index, casts)
+
+    @classmethod
+    def from_labels(cls, labels, position):
+        """
+        Rebuilds an index from the `labels` of a previous one.
+        """
+        component_index = cls(0, position, ())
+        component_index.parent.frombytes(memoryview(labels).cast("B"))
+        component_index.size = array.array("i", [1]) * len(component_index.parent)
+        for root, size in collections.Counter(labels).items():
+            component_index.size[root] = size
+        return component_index
+
+    def _find(self, p):
+        parent = self.parent
+        while parent[p] != p:
+            parent[p] = parent[parent[p]]
+            p = parent[p]
+        return p
+
+    def _union(self, p, q):
+        p = self._find(p)
+        q = self._find(q)
+        if p == q:
+            return p
+        if self.size[p] < self.size[q]:
+            p, q = q, p
+        self.parent[q] = p
+        self.size[p] += self.size[q]
+        if q in self.dirty:
+            self.dirty.discard(q)
+            self.dirty.add(p)
+        return p
+
+    def connected(self, a, b):
+        """
+        Returns whether people `a` and `b` are connected, or None when
+        the index cannot tell (unknown people or a dirty component).
+        """
+        p = self.position(a)
+        q = self.position(b)
+        if p is None or q is None:
+            return None
+        p = self._find(p)
+        q = self._find(q)
+        if p in self.dirty or q in self.dirty:
+            return None
+        return p == q
+
+    def labels(self):
+        """
+        Returns the representative position of every person's component.
+        """
+        return array.array("i", map(self._find, range(len(self.parent))))
+
+    def component_size(self, person_id):
+        p = self.position(person_id)
+        return None if p is None else self.size[self._find(p)]
+
+    def add_person(self, person_id):
+        """
+        Adds an isolated person (dict-built indexes only).
+        """
+        self.index[person_id] = len(self.parent)
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+
+    def link(self, a, b):
+        """
+        Records that `a` and `b` became co-stars.
+        """
+        self._union(self.position(a), self.position(b))
+
+    def unlink(self, a):
+        """
+        Records that `a` lost a link: its component may have split.
+        """
+        self.dirty.add(self._find(self.position(a)))
+
+    def sizes(self):
+        """
+        Returns the size of every component, largest first.
+        """
+        return sorted(
+            (self.size[p] for p in range(len(self.parent)) if self.parent[p] == p),
+            reverse=True
+        )
+
+    def stats(self, top=5):
+        sizes = self.sizes()
+        return {
+            "components": len(sizes),
+            "people": sum(sizes),
+            "largest": sizes[:top],
+            "singletons": sum(1 for size in sizes if size == 1),
+            "dirty": len(self.dirty),
+            "answered": self.answered
+        }
@@ -0,0 +1,96 @@
+"""
+Precomputed person -> co-star adjacency for degrees.neighbors_for_person.
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+
+class CoStarIndex():
+    """
+    Caches the (movie_id, person_id) neighbors of each person as one
+    shared tuple, so repeated expansions of the same person allocate
+    nothing.
+
+    `neighbors` is the function computing a person's neighbors. With
+    `max_size` the index is filled lazily and keeps at most that many
+    people, evicting the least recently used; without it every person
+    is kept once computed.
+    """
+
+    def __init__(self, neighbors, max_size=None):
+        self.neighbors = neighbors
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build_time = 0.0
+
+    def build(self, person_ids):
+        """
+        Eagerly computes the neighbors of every person in `person_ids`.
+        """
+        start = time.perf_counter()
+        for person_id in person_ids:
+            if person_id not in self.entries:
+                self.entries[person_id] = tuple(self.neighbors(person_id))
+        self.build_time += time.perf_counter() - start
+
+    def get(self, person_id):
+        """
+        Returns a tuple of (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        entries = self.entries
+        pairs = entries.get(person_id)
+        if pairs is not None:
+            self.hits += 1
+            if self.max_size is not None:
+                entries.move_to_end(person_id)
+            return pairs
+
+        self.misses += 1
+        start = time.perf_counter()
+        pairs = tuple(self.neighbors(person_id))
+        self.build_time += time.perf_counter() - start
+        entries[person_id] = pairs
+        if self.max_size is not None and len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return pairs
+
+    def invalidate(self, person_ids=None):
+        """
+        Drops the cached neighbors of `person_ids`, or of everyone.
+        """
+        if person_ids is None:
+            self.entries.clear()
+            return
+        for person_id in person_ids:
+            self.entries.pop(person_id, None)
+
+    def memory(self):
+        """
+        Approximate bytes held by the index: the dict slots plus every
+        neighbor tuple (the id strings are shared with the dataset).
+        """
+        total = sys.getsizeof(self.entries)
+        for pairs in self.entries.values():
+            total += sys.getsizeof(pairs)
+            total += sum(sys.getsizeof(pair) for pair in pairs)
+        return total
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "people": len(self.entries),
+            "pairs": sum(len(pairs) for pairs in self.entries.values()),
+            "memory": self.memory(),
+            "build_time": self.build_time,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -1,7 +1,20 @@
+import argparse
 import csv
+import itertools
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+import allpaths
+import snapshot
+import streaming
+import weighted
+from components import ComponentIndex
+from costars import CoStarIndex
+from graph import graph_from_dicts, load_graph
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+from pathcache import PathCache
+from util import Node, SearchStats, DequeQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,6 +25,36 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact Graph backing names/people/movies, set by load_compact
+graph = None
+
+# Optional CoStarIndex consulted by neighbors_for_person, set by use_costar_index
+costars = None
+
+# Optional PathCache of shortest_path results, set by use_path_cache
+path_cache = None
+
+# Optional LandmarkIndex bounding and pruning searches, set by use_landmarks
+landmarks = None
+
+# Optional NameIndex for prefix and fuzzy name lookups, set by use_name_index
+name_index = None
+
+# Optional ComponentIndex answering disconnected queries, set by use_components
+components = None
+
+# SearchStats of the most recent shortest_path call
+last_search = None
+
+# Strategies accepted by shortest_path
+SEARCH_MODES = ("bfs", "bidirectional", "recent", "popular")
+
+# Movie cost functions of the weighted modes, see cheapest_path
+MOVIE_COSTS = {
+    "recent": weighted.recency_cost(),
+    "popular": weighted.popularity_cost()
+}
+
 
 def load_data(directory):
     """
@@ -52,120 +95,608 @@ def load_data(directory):
                 pass
 
 
+def load_filtered(directory, compact=False, **filters):
+    """
+    Load a reduced dataset through the streaming loader; `filters` are
+    the keyword arguments of streaming.load_filtered. With `compact`
+    the result is kept as a Graph, as with load_compact.
+    """
+    global graph, names, people, movies
+    if not compact:
+        streaming.load_filtered(directory, names, people, movies, **filters)
+        return
+    loaded_people, loaded_movies = {}, {}
+    streaming.load_filtered(directory, {}, loaded_people, loaded_movies, **filters)
+    graph = graph_from_dicts(loaded_people, loaded_movies)
+    names, people, movies = graph.names, graph.people, graph.movies
+
+
+def load_compact(directory, use_snapshot=False):
+    """
+    Load data from CSV files into a compact Graph. `names`, `people` and
+    `movies` become read-only views of it, and searches run on it directly.
+
+    With `use_snapshot`, the graph is mapped from the binary snapshot in
+    `directory` when it is up to date, and the snapshot is (re)written
+    otherwise.
+    """
+    global graph, names, people, movies
+    graph = snapshot.load(directory) if use_snapshot else load_graph(directory)
+    names, people, movies = graph.names, graph.people, graph.movies
+
+
+def use_costar_index(max_size=None):
+    """
+    Makes neighbors_for_person answer from a CoStarIndex. Without
+    `max_size` the neighbors of every person are precomputed now;
+    otherwise they are computed on first use and at most `max_size`
+    people are kept, least recently used first out.
+
+    A compact Graph already indexes co-stars in its CSR arrays, and its
+    search never calls neighbors_for_person, so it refuses the index.
+    """
+    global costars
+    if graph is not None:
+        raise ValueError("a compact graph does not use the co-star index")
+    index = CoStarIndex(_neighbors_for_person, max_size)
+    if max_size is None:
+        index.build(people)
+    costars = index
+
+
+def use_path_cache(max_size):
+    """
+    Makes shortest_path remember the results of up to `max_size` queries.
+    """
+    global path_cache
+    path_cache = PathCache(max_size)
+
+
+def use_landmarks(count):
+    """
+    Indexes BFS distances from the `count` best connected people, used
+    by shortest_path to rule out disconnected pairs and prune searches.
+    """
+    global landmarks
+    if graph is not None:
+        landmarks = LandmarkIndex.from_graph(graph, neighbors_for_person, count)
+    else:
+        landmarks = LandmarkIndex.from_dicts(people, movies, neighbors_for_person, count)
+
+
+def use_name_index():
+    """
+    Indexes every name for prefix and fuzzy lookups by suggest_names.
+    """
+    global name_index
+    name_index = NameIndex(names)
+
+
+def use_components():
+    """
+    Builds (or rebuilds) the connected-component index used by
+    shortest_path to answer disconnected queries immediately.
+    """
+    global components
+    if graph is not None:
+        components = ComponentIndex.from_graph(graph)
+    else:
+        components = ComponentIndex.from_dicts(people, movies)
+
+
+def add_arguments(parser):
+    """
+    Adds the dataset and search options shared by the degrees tools.
+    """
+    parser.add_argument("directory", nargs="?", default="large") #"/Users/alejo/Scripts/degrees/large" #
+    parser.add_argument("--compact", action="store_true",
+                        help="keep the dataset in an integer-indexed CSR graph")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="like --compact, reusing a binary snapshot of the CSV files")
+    parser.add_argument("--since", type=int, metavar="YEAR",
+                        help="only load movies from YEAR on")
+    parser.add_argument("--until", type=int, metavar="YEAR",
+                        help="only load movies up to YEAR")
+    parser.add_argument("--min-credits", type=int, metavar="N",
+                        help="only load people with at least N credits in loaded movies")
+    parser.add_argument("--progress", action="store_true",
+                        help="report loading progress on stderr")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="index names to suggest close matches for unknown names")
+    parser.add_argument("--no-components", action="store_true",
+                        help="do not index connected components")
+    parser.add_argument("--costars", type=int, metavar="N",
+                        help="cache co-stars of up to N people (0 precomputes everyone); "
+                             "not with --compact or --snapshot")
+    parser.add_argument("--cache", type=int, metavar="N",
+                        help="cache the results of up to N queries")
+    parser.add_argument("--landmarks", type=int, metavar="K",
+                        help="bound and prune searches with K landmark people")
+
+
+def setup(args):
+    """
+    Loads the dataset and enables the indexes requested by `args`.
+    """
+    filters = {}
+    if args.since is not None:
+        filters["min_year"] = args.since
+    if args.until is not None:
+        filters["max_year"] = args.until
+    if args.min_credits is not None:
+        filters["min_credits"] = args.min_credits
+    if args.progress:
+        filters["progress"] = streaming.print_progress
+
+    if args.costars is not None and (args.compact or args.snapshot):
+        sys.exit("--costars cannot be combined with --compact or --snapshot")
+    if filters:
+        if args.snapshot:
+            sys.exit("--snapshot cannot be combined with filters or --progress")
+        load_filtered(args.directory, compact=args.compact, **filters)
+    elif args.compact or args.snapshot:
+        load_compact(args.directory, use_snapshot=args.snapshot)
+    else:
+        load_data(args.directory)
+    if not args.no_components:
+        use_components()
+    if args.fuzzy:
+        use_name_index()
+    if args.costars is not None:
+        use_costar_index(args.costars or None)
+    if args.cache is not None:
+        use_path_cache(args.cache)
+    if args.landmarks is not None:
+        use_landmarks(args.landmarks)
+
+
+def report():
+    """
+    Returns one line of statistics for each enabled index.
+    """
+    lines = []
+    if components is not None:
+        stats = components.stats()
+        lines.append(f"Components: {stats['components']} over {stats['people']} people, "
+                     f"largest {stats['largest']}, {stats['singletons']} singletons, "
+                     f"{stats['answered']} queries answered")
+    if costars is not None:
+        stats = costars.stats()
+        lines.append(f"Co-star index: {stats['people']} people, {stats['pairs']} pairs, "
+                     f"{stats['memory'] / 2**20:.1f} MiB, built in {stats['build_time']:.2f}s, "
+                     f"hit rate {stats['hit_rate']:.1%}")
+    if path_cache is not None:
+        stats = path_cache.stats()
+        lines.append(f"Path cache: {stats['size']} entries, {stats['hits']} hits, "
+                     f"{stats['misses']} misses, hit rate {stats['hit_rate']:.1%}")
+    if landmarks is not None:
+        stats = landmarks.stats()
+        lines.append(f"Landmarks: {stats['landmarks']} built in {stats['build_time']:.2f}s, "
+                     f"{stats['queries']} queries, {stats['unreachable']} answered unreachable, "
+                     f"{stats['expanded']} expanded, {stats['pruned']} pruned")
+    return lines
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large" #"/Users/alejo/Scripts/degrees/large" #
+    parser = argparse.ArgumentParser(usage="python degrees.py [directory] [--mode MODE] [options]")
+    add_arguments(parser)
+    parser.add_argument("--mode", choices=SEARCH_MODES, default="bfs",
+                        help="search strategy used by shortest_path")
+    parser.add_argument("--alternatives", type=int, metavar="K",
+                        help="print up to K shortest paths, most recent movies first")
+    parser.add_argument("--stats", action="store_true",
+                        help="print search statistics")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    setup(args)
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
-    if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
-    if target is None:
-        sys.exit("Person not found.")
+    source = _ask_for_person()
+    target = _ask_for_person()
 
-    path = shortest_path(source, target)
-
-    if path is None:
-        print("Not connected.")
+    if args.alternatives is not None:
+        paths = list(itertools.islice(ranked_shortest_paths(source, target), args.alternatives))
+        if not paths:
+            print("Not connected.")
+        for number, path in enumerate(paths, 1):
+            print(f"Path {number}:")
+            print_path(source, path)
     else:
-        degrees = len(path)
-        print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        path = shortest_path(source, target, mode=args.mode)
+
+        if path is None:
+            print("Not connected.")
+        else:
+            print_path(source, path)
+        if args.stats and last_search is not None:
+            stats = last_search
+            print(f"Search: {stats.expanded} expanded, frontier peak {stats.frontier_peak}, "
+                  f"layers {stats.layers}, {stats.elapsed * 1000:.2f} ms")
+
+    for line in report():
+        print(line)
+
+
+def print_path(source, path):
+    """
+    Prints a path from `source` returned by shortest_path.
+    """
+    degrees = len(path)
+    print(f"{degrees} degrees of separation.")
+    path = [(None, source)] + path
+    for i in range(degrees):
+        person1 = people[path[i][1]]["name"]
+        person2 = people[path[i + 1][1]]["name"]
+        movie = movies[path[i + 1][0]]["title"]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def _ask_for_person():
+    """
+    Reads a name from the user and returns the matching person_id,
+    exiting with suggestions when nobody matches.
+    """
+    name = input("Name: ")
+    person_id = person_id_for_name(name)
+    if person_id is None:
+        suggestions = suggest_names(name)
+        if suggestions:
+            print("Did you mean: " + ", ".join(people[ids[0]]["name"] for _, ids in suggestions) + "?")
+        sys.exit("Person not found.")
+    return person_id
+
+
+def shortest_path(source, target, mode="bfs"):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `mode` selects the search strategy, one of SEARCH_MODES. The
+    weighted modes in MOVIE_COSTS return the cheapest path instead,
+    see cheapest_path.
+
     If no possible path, returns None.
     """
-    
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"unknown search mode: {mode}")
+    global last_search
+    last_search = None
+    if path_cache is not None:
+        return path_cache.get((source, target, mode), lambda: _shortest_path(source, target, mode))
+    return _shortest_path(source, target, mode)
+
+
+def _shortest_path(source, target, mode):
+    """
+    Runs the search behind shortest_path, bypassing the path cache,
+    and records its SearchStats in `last_search`.
+    """
+    global last_search
+    stats = SearchStats()
+    last_search = stats
+    start = time.perf_counter()
+    try:
+        return _search(source, target, mode, stats)
+    finally:
+        stats.elapsed = time.perf_counter() - start
+
+
+def _search(source, target, mode, stats):
+    if components is not None and components.connected(source, target) is False:
+        components.answered += 1
+        return None
+    if landmarks is not None:
+        if mode == "bfs":
+            search = None if graph is None else graph.shortest_path
+            return landmarks.shortest_path(source, target, stats, search)
+        if landmarks.reachable(source, target) is False:
+            return None
+    if mode in MOVIE_COSTS:
+        return cheapest_path(source, target, MOVIE_COSTS[mode], stats)
+    if mode == "bidirectional":
+        return shortest_path_bidirectional(source, target, stats)
+    if graph is not None:
+        return graph.shortest_path(source, target, stats)
+
     start = Node(state=source, parent=None, action=None)
+    stats.reached(0)
+    if source == target:
+        return []
 
     num_explored = 0
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     frontier.add(start)
+    stats.frontier_peak = 1
 
     explored = set()
+    depths = {source: 0}
 
     while True:
         
         #Me fijo si la frontera no esta vacia
         if frontier.empty():
-                raise Exception("no solution")
+            return None
 
         #agarro uno de la frontera y agrego un paso
         actual = frontier.remove()
         num_explored += 1
-        
-        # If node is the goal, then we have a solution
-        if actual.state == target:
-            pasos = []
-            while actual.parent is not None:
-                paso = actual.action,actual.state
-                pasos.append(paso)
-                actual = actual.parent
-            pasos.reverse()
-            solution = pasos
-            return solution
+        stats.expanded = num_explored
 
         explored.add(actual.state)
-        #print(explored)
         #obtengo los vecinos y los agrego a la frontera
         vecinos = neighbors_for_person(actual.state)
-
+        depth = depths[actual.state] + 1
 
         #agrego los vecinos a la frontera
         for movie_id, person_id in vecinos:
             if not frontier.contains_state(person_id) and person_id not in explored:
                 child = Node(state=person_id, parent=actual, action=movie_id)
-                frontier.add(child)        
-        
+                stats.reached(depth)
+
+                # If node is the goal, then we have a solution; testing here
+                # saves expanding the whole next layer
+                if person_id == target:
+                    pasos = []
+                    while child.parent is not None:
+                        paso = child.action, child.state
+                        pasos.append(paso)
+                        child = child.parent
+                    pasos.reverse()
+                    return pasos
+
+                frontier.add(child)
+                depths[person_id] = depth
+        stats.frontier_peak = max(stats.frontier_peak, len(frontier.frontier))
+
+
+def cheapest_path(source, target, cost, stats=None):
+    """
+    Returns the list of (movie_id, person_id) pairs that connect the
+    source to the target through the movies with the lowest total
+    `cost(year, cast_size)`, or None if there is no possible path.
+    With landmarks enabled, their distance bounds guide an A* search.
+    """
+    if graph is not None:
+        s = graph.person_index(source)
+        t = graph.person_index(target)
+        if s is None or t is None:
+            return None
+
+        def year(m):
+            return weighted.parse_year(graph.movie_years[m])
+
+        def cast_size(m):
+            return graph.movie_offsets[m + 1] - graph.movie_offsets[m]
+
+        def person_id(p):
+            return graph.person_ids[p]
+
+        movies_of, stars_of = graph.movies_of, graph.stars_of
+    else:
+        s, t = source, target
+
+        def year(movie_id):
+            return weighted.parse_year(movies[movie_id]["year"])
+
+        def cast_size(movie_id):
+            return len(movies[movie_id]["stars"])
+
+        def person_id(p):
+            return p
+
+        def movies_of(p):
+            return people[p]["movies"]
+
+        def stars_of(movie_id):
+            return movies[movie_id]["stars"]
+
+    costs = {}
+
+    def movie_cost(movie):
+        if movie not in costs:
+            costs[movie] = cost(year(movie), cast_size(movie))
+        return costs[movie]
+
+    heuristic = None
+    if landmarks is not None:
+        def heuristic(p):
+            return landmarks.lower_bound(person_id(p), target)
+
+    path = weighted.cheapest_path(s, t, movies_of, stars_of, movie_cost, heuristic, stats)
+    if path is None or graph is None:
+        return path
+    return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, one at a time, from a single BFS.
+    Yields nothing if there is no possible path.
+    """
+    dag = allpaths.parent_dag(source, target, neighbors_for_person)
+    if dag is not None:
+        yield from allpaths.enumerate_paths(dag, source, target)
+
+
+def ranked_shortest_paths(source, target, weight=None):
+    """
+    Like all_shortest_paths, but yields paths in increasing order of the
+    summed `weight(movie_id)`; by default the paths through the most
+    recent movies come first.
+    """
+    if weight is None:
+        weight = recency_weight
+    dag = allpaths.parent_dag(source, target, neighbors_for_person)
+    if dag is not None:
+        yield from allpaths.ranked_paths(dag, source, target, weight)
+
+
+def recency_weight(movie_id):
+    """
+    Path weight favoring recent movies: minus the movie's year,
+    or 0 when the year is unknown.
+    """
+    try:
+        return -int(movies[movie_id]["year"])
+    except ValueError:
+        return 0
+
+
+def shortest_path_bidirectional(source, target, stats=None):
+    """
+    Same contract as `shortest_path`, but searches from `source` and
+    `target` at the same time, one whole BFS layer per step, always
+    growing the smaller side. The search stops once the two sides meet.
+
+    `stats`, a SearchStats, gets layer sizes counted per step of
+    either side.
+    """
+    if stats is None:
+        stats = SearchStats()
+    stats.reached(0, 2 if source != target else 1)
+    if source == target:
+        return []
+
+    # Maps person_id to the (movie_id, person_id) step that reached it:
+    # towards the source on the forward side, towards the target on the
+    # backward side.
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        stats.frontier_peak = max(stats.frontier_peak, len(forward_layer) + len(backward_layer))
+        if len(forward_layer) <= len(backward_layer):
+            stats.expanded += len(forward_layer)
+            forward_layer, meeting = _expand_layer(forward_layer, forward, backward)
+            stats.reached(len(stats.layers), len(forward_layer))
+        else:
+            stats.expanded += len(backward_layer)
+            backward_layer, meeting = _expand_layer(backward_layer, backward, forward)
+            stats.reached(len(stats.layers), len(backward_layer))
+        if meeting is not None:
+            return _join_paths(meeting, forward, backward)
+
+    return None
+
+
+def _expand_layer(layer, parents, others):
+    """
+    Expands every person in `layer`, recording parents for newly seen
+    people. Returns the next layer and the first person already seen by
+    the other side, or None if the sides have not met yet.
+    """
+    next_layer = []
+    for person_id in layer:
+        for movie_id, neighbor in neighbors_for_person(person_id):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (movie_id, person_id)
+            if neighbor in others:
+                return next_layer, neighbor
+            next_layer.append(neighbor)
+    return next_layer, None
+
 
+def _join_paths(meeting, forward, backward):
+    """
+    Builds the source->target path through `meeting` from the parent
+    maps of a bidirectional search.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, child = backward[person_id]
+        path.append((movie_id, child))
+        person_id = child
+    return path
 
-def person_id_for_name(name):
+
+def person_id_for_name(name, choose=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    Ambiguous names are resolved by `choose(name, person_ids)`, which
+    returns one of `person_ids` or None; by default the user is asked.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
-        print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
+        if choose is None:
+            choose = _choose_person
+        return choose(name, person_ids)
     else:
         return person_ids[0]
 
 
+def _choose_person(name, person_ids):
+    """
+    Asks the user which of `person_ids` they meant by `name`.
+    """
+    print(f"Which '{name}'?")
+    for person_id in person_ids:
+        person = people[person_id]
+        name = person["name"]
+        birth = person["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
+def suggest_names(name, limit=5, max_distance=2):
+    """
+    Returns up to `limit` (name, person_ids) pairs for names close to
+    `name`: names it is a prefix of first, then names within
+    `max_distance` edits. Empty unless use_name_index was called.
+    """
+    if name_index is None:
+        return []
+    suggestions = name_index.prefix(name, limit)
+    seen = {match for match, _ in suggestions}
+    for match, person_ids, _ in name_index.fuzzy(name, max_distance, limit):
+        if len(suggestions) >= limit:
+            break
+        if match not in seen:
+            suggestions.append((match, person_ids))
+            seen.add(match)
+    return suggestions
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if costars is not None:
+        return costars.get(person_id)
+    return _neighbors_for_person(person_id)
+
+
+def _neighbors_for_person(person_id):
+    """
+    Computes neighbors_for_person from the dataset, bypassing the
+    co-star index.
+    """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
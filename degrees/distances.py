@@ -0,0 +1,215 @@
+"""
+Degrees-of-separation distributions from many sources at once.
+
+`distance_distributions` runs a multi-source BFS over a compact Graph:
+each person carries a bitset (a Python int) of the sources that have
+reached them, so one sweep over the graph advances every source in a
+batch by one layer, and each movie's cast is scanned once per layer for
+the whole batch. Batches of sources are sharded across a
+multiprocessing pool; workers read the graph's CSR arrays from shared
+memory instead of receiving a copy.
+
+Usage: python distances.py [directory] [--hubs N | --random N] [--workers W] [--batch B]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+from multiprocessing import shared_memory
+
+import snapshot
+
+# CSR arrays of a Graph needed by the search, with their typecodes
+SHARED_ARRAYS = (
+    ("person_offsets", "q"),
+    ("person_movies", "i"),
+    ("movie_offsets", "q"),
+    ("movie_people", "i")
+)
+
+# Sources advanced together by one bitset sweep
+BATCH_SIZE = 64
+
+# Arrays attached by each pool worker
+_shared = None
+
+
+def layer_counts(person_offsets, person_movies, movie_offsets, movie_people, sources):
+    """
+    Runs a BFS from every person index in `sources` at once.
+
+    Returns one list per source where item d is the number of people at
+    exactly d degrees of separation from it.
+    """
+    num_people = len(person_offsets) - 1
+    visited = [0] * num_people
+    frontier = {}
+    for bit, p in enumerate(sources):
+        frontier[p] = frontier.get(p, 0) | (1 << bit)
+        visited[p] |= 1 << bit
+    counts = [[1] for _ in sources]
+
+    while frontier:
+        # Gather, per movie, which sources reach it in this layer
+        reached_movies = {}
+        for p, mask in frontier.items():
+            for i in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[i]
+                reached_movies[m] = reached_movies.get(m, 0) | mask
+
+        next_frontier = {}
+        for m, mask in reached_movies.items():
+            for i in range(movie_offsets[m], movie_offsets[m + 1]):
+                q = movie_people[i]
+                new = mask & ~visited[q]
+                if new:
+                    visited[q] |= new
+                    next_frontier[q] = next_frontier.get(q, 0) | new
+
+        if not next_frontier:
+            break
+        for source_counts in counts:
+            source_counts.append(0)
+        for mask in next_frontier.values():
+            while mask:
+                low = mask & -mask
+                counts[low.bit_length() - 1][-1] += 1
+                mask ^= low
+        frontier = next_frontier
+
+    # Drop trailing empty layers of sources that finished early
+    for source_counts in counts:
+        while source_counts[-1] == 0:
+            source_counts.pop()
+    return counts
+
+
+def distance_distributions(graph, sources, workers=None, batch_size=BATCH_SIZE):
+    """
+    Returns {person_id: distances} for every person_id in `sources`,
+    where distances[d] is the number of people exactly d degrees away.
+
+    With more than one worker, batches of sources are spread over a
+    process pool sharing the graph's arrays through shared memory.
+    """
+    indices = []
+    for person_id in sources:
+        p = graph.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        indices.append(p)
+    batches = [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(batches))
+    if workers <= 1:
+        arrays = [getattr(graph, name) for name, _ in SHARED_ARRAYS]
+        results = [layer_counts(*arrays, batch) for batch in batches]
+    else:
+        results = _run_pool(graph, batches, workers)
+
+    distributions = {}
+    for batch, batch_counts in zip(batches, results):
+        for p, source_counts in zip(batch, batch_counts):
+            distributions[graph.person_ids[p]] = source_counts
+    return distributions
+
+
+def _run_pool(graph, batches, workers):
+    """
+    Copies the graph's CSR arrays into shared memory blocks and maps
+    `batches` over a pool of workers attached to them.
+    """
+    blocks = []
+    try:
+        specs = []
+        for name, typecode in SHARED_ARRAYS:
+            data = memoryview(getattr(graph, name)).cast("B")
+            block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+            blocks.append(block)
+            block.buf[:len(data)] = data
+            specs.append((block.name, len(data), typecode))
+        with multiprocessing.Pool(workers, initializer=_attach, initargs=(specs,)) as pool:
+            return pool.map(_run_batch, batches)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _attach(specs):
+    """
+    Pool initializer: maps the shared CSR arrays into this worker.
+    """
+    global _shared
+    _shared = []
+    for name, length, typecode in specs:
+        block = shared_memory.SharedMemory(name=name)
+        _shared.append((block, block.buf[:length].cast(typecode)))
+
+
+def _run_batch(batch):
+    return layer_counts(*(view for _, view in _shared), batch)
+
+
+def summarize(distances):
+    """
+    Returns (people reached, mean degrees of separation) for one
+    distribution, not counting the source itself.
+    """
+    reached = sum(distances) - 1
+    if reached == 0:
+        return 0, None
+    return reached, sum(d * count for d, count in enumerate(distances)) / reached
+
+
+def hubs(graph, n):
+    """
+    Returns the person_ids of the `n` people with the most co-star links,
+    counted as the total cast size of their movies.
+    """
+    def degree(p):
+        return sum(
+            graph.movie_offsets[m + 1] - graph.movie_offsets[m]
+            for m in graph.movies_of(p)
+        )
+    ranked = sorted(range(graph.num_people), key=degree, reverse=True)
+    return [graph.person_ids[p] for p in ranked[:n]]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python distances.py [directory] [--hubs N | --random N] [--workers W] [--batch B]")
+    parser.add_argument("directory", nargs="?", default="large")
+    choice = parser.add_mutually_exclusive_group()
+    choice.add_argument("--hubs", type=int, metavar="N", help="use the N best connected people as sources")
+    choice.add_argument("--random", type=int, metavar="N", help="use N random people as sources")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = snapshot.load(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    if args.random is not None:
+        rng = random.Random(args.seed)
+        sources = rng.sample(list(graph.person_ids), min(args.random, graph.num_people))
+    else:
+        sources = hubs(graph, args.hubs if args.hubs is not None else 10)
+
+    distributions = distance_distributions(graph, sources, args.workers, args.batch)
+    for person_id in sources:
+        distances = distributions[person_id]
+        reached, mean = summarize(distances)
+        name = graph.person_names[graph.person_index(person_id)]
+        mean = "-" if mean is None else f"{mean:.3f}"
+        print(f"{person_id}\t{name}\treached {reached}\tmean {mean}\t{distances}")
+
+
+if __name__ == "__main__":
+    main()
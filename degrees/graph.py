@@ -0,0 +1,446 @@
+"""
+Compact in-memory store for the degrees dataset.
+
+People and movies are renumbered to dense integers (in sorted IMDb id
+order) and the person<->movie bipartite graph is kept CSR-style: for
+each side an `offsets` array and a flat `neighbors` array, so the
+movies of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`.
+Strings are packed into `StringTable`s instead of one object per value.
+
+Run `python graph.py [directory]` to compare memory use and query time
+against the dict-of-sets representation in degrees.py.
+"""
+
+import argparse
+import array
+import bisect
+import csv
+import random
+import time
+import tracemalloc
+from collections.abc import Mapping
+
+
+class StringTable():
+    """
+    Immutable sequence of strings stored as one UTF-8 buffer
+    plus an offsets array.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array.array("q", [0])
+        data = bytearray()
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        return cls(offsets, bytes(data))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class Graph():
+    """
+    Person<->movie bipartite graph over dense integer indices.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 name_order, component_labels=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Person indices sorted by lowercased name, for name lookups
+        self.name_order = name_order
+
+        # Representative person index of each person's connected
+        # component, when known (see components.ComponentIndex.from_graph)
+        self.component_labels = component_labels
+
+        # Dict-like views with the same shape as degrees.names/people/movies
+        self.names = NamesView(self)
+        self.people = PeopleView(self)
+        self.movies = MoviesView(self)
+
+    @property
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    @property
+    def num_movies(self):
+        return len(self.movie_offsets) - 1
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of `person_id`, or None if unknown.
+        """
+        return _find(self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of `movie_id`, or None if unknown.
+        """
+        return _find(self.movie_ids, movie_id)
+
+    def movies_of(self, p):
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        return self.movie_people[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def person_indices_for_name(self, name):
+        """
+        Returns the indices of every person whose lowercased name is `name`.
+        """
+        name = name.lower()
+        order = self.name_order
+        key = self._name_key
+        lo = bisect.bisect_left(order, name, key=key)
+        hi = bisect.bisect_right(order, name, lo=lo, key=key)
+        return [order[i] for i in range(lo, hi)]
+
+    def _name_key(self, p):
+        return self.person_names[p].lower()
+
+    def neighbors(self, p):
+        """
+        Yields (movie index, person index) pairs for people
+        who starred with person `p`.
+        """
+        for m in self.movies_of(p):
+            for q in self.stars_of(m):
+                yield m, q
+
+    def neighbors_for_person(self, person_id):
+        """
+        Same contract as degrees.neighbors_for_person.
+        """
+        p = self.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return {
+            (self.movie_ids[m], self.person_ids[q])
+            for m, q in self.neighbors(p)
+        }
+
+    def shortest_path(self, source, target, stats=None, prune=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, or None if there is no path.
+
+        BFS over dense indices: visited state and parents live in flat
+        arrays, every movie's cast is scanned at most once and the goal
+        is tested when a person is first reached. `stats`, a
+        util.SearchStats, is filled in when given. `prune(p, depth)`,
+        when given, is asked before expanding person `p` found `depth`
+        steps from the source; people it rejects are not expanded.
+        """
+        s = self.person_index(source)
+        t = self.person_index(target)
+        if s is None or t is None:
+            return None
+        if stats is not None:
+            stats.reached(0)
+        if s == t:
+            return []
+        parent_person = array.array("i", [-1]) * self.num_people
+        parent_movie = array.array("i", [-1]) * self.num_people
+        seen_movie = bytearray(self.num_movies)
+        parent_person[s] = s
+
+        layer = [s]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            if stats is not None:
+                stats.frontier_peak = max(stats.frontier_peak, len(layer))
+            for p in layer:
+                if prune is not None and prune(p, depth - 1):
+                    continue
+                if stats is not None:
+                    stats.expanded += 1
+                for m in self.movies_of(p):
+                    if seen_movie[m]:
+                        continue
+                    seen_movie[m] = 1
+                    for q in self.stars_of(m):
+                        if parent_person[q] != -1:
+                            continue
+                        parent_person[q] = p
+                        parent_movie[q] = m
+                        if q == t:
+                            if stats is not None:
+                                stats.reached(depth, len(next_layer) + 1)
+                            return self._path(s, t, parent_person, parent_movie)
+                        next_layer.append(q)
+            if stats is not None and next_layer:
+                stats.reached(depth, len(next_layer))
+            layer = next_layer
+        return None
+
+    def _path(self, s, t, parent_person, parent_movie):
+        path = []
+        q = t
+        while q != s:
+            path.append((self.movie_ids[parent_movie[q]], self.person_ids[q]))
+            q = parent_person[q]
+        path.reverse()
+        return path
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a Graph shaped like degrees.names.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        person_ids = {
+            self.graph.person_ids[p]
+            for p in self.graph.person_indices_for_name(name)
+        }
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+    def __iter__(self):
+        last = None
+        for p in self.graph.name_order:
+            name = self.graph.person_names[p].lower()
+            if name != last:
+                yield name
+                last = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a Graph shaped like degrees.people.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        p = graph.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return {
+            "name": graph.person_names[p],
+            "birth": graph.person_births[p],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(p)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a Graph shaped like degrees.movies.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        m = graph.movie_index(movie_id)
+        if m is None:
+            raise KeyError(movie_id)
+        return {
+            "title": graph.movie_titles[m],
+            "year": graph.movie_years[m],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(m)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies
+
+
+def _find(table, value):
+    """
+    Binary search for `value` in a sorted sequence, returning its index or None.
+    """
+    i = bisect.bisect_left(table, value)
+    if i < len(table) and table[i] == value:
+        return i
+    return None
+
+
+def load_graph(directory):
+    """
+    Load the CSV files in `directory` straight into a Graph,
+    without building the dict-of-sets representation.
+    """
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        person_rows = [(row["id"], row["name"], row["birth"]) for row in csv.DictReader(f)]
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        movie_rows = [(row["id"], row["title"], row["year"]) for row in csv.DictReader(f)]
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        links = [(row["person_id"], row["movie_id"]) for row in csv.DictReader(f)]
+    return build_graph(person_rows, movie_rows, links)
+
+
+def graph_from_dicts(people, movies):
+    """
+    Build a Graph from the `people` and `movies` dicts of degrees.py.
+    """
+    person_rows = [(person_id, person["name"], person["birth"]) for person_id, person in people.items()]
+    movie_rows = [(movie_id, movie["title"], movie["year"]) for movie_id, movie in movies.items()]
+    links = [
+        (person_id, movie_id)
+        for person_id, person in people.items()
+        for movie_id in person["movies"]
+    ]
+    return build_graph(person_rows, movie_rows, links)
+
+
+def build_graph(person_rows, movie_rows, links):
+    """
+    Build a Graph from (id, name, birth) person rows, (id, title, year)
+    movie rows and (person_id, movie_id) links. Links to unknown ids and
+    duplicate links are dropped, like load_data does.
+    """
+    person_rows = sorted(person_rows)
+    movie_rows = sorted(movie_rows)
+    person_index = {row[0]: i for i, row in enumerate(person_rows)}
+    movie_index = {row[0]: i for i, row in enumerate(movie_rows)}
+    num_people = len(person_rows)
+    num_movies = len(movie_rows)
+
+    # Encode each link as one integer so sorting groups them by person
+    keys = set()
+    for person_id, movie_id in links:
+        p = person_index.get(person_id)
+        m = movie_index.get(movie_id)
+        if p is not None and m is not None:
+            keys.add(p * num_movies + m)
+    keys = sorted(keys)
+
+    person_offsets = array.array("q", [0]) * (num_people + 1)
+    person_movies = array.array("i", [0]) * len(keys)
+    movie_offsets = array.array("q", [0]) * (num_movies + 1)
+    for i, key in enumerate(keys):
+        p, m = divmod(key, num_movies)
+        person_offsets[p + 1] += 1
+        movie_offsets[m + 1] += 1
+        person_movies[i] = m
+    for i in range(num_people):
+        person_offsets[i + 1] += person_offsets[i]
+    for i in range(num_movies):
+        movie_offsets[i + 1] += movie_offsets[i]
+
+    # Counting sort of the links by movie
+    movie_people = array.array("i", [0]) * len(keys)
+    fill = array.array("q", movie_offsets[:-1])
+    for key in keys:
+        p, m = divmod(key, num_movies)
+        movie_people[fill[m]] = p
+        fill[m] += 1
+
+    name_order = array.array("i", sorted(
+        range(num_people), key=lambda p: person_rows[p][1].lower()
+    ))
+
+    return Graph(
+        person_ids=StringTable.from_strings(row[0] for row in person_rows),
+        person_names=StringTable.from_strings(row[1] for row in person_rows),
+        person_births=StringTable.from_strings(row[2] for row in person_rows),
+        movie_ids=StringTable.from_strings(row[0] for row in movie_rows),
+        movie_titles=StringTable.from_strings(row[1] for row in movie_rows),
+        movie_years=StringTable.from_strings(row[2] for row in movie_rows),
+        person_offsets=person_offsets,
+        person_movies=person_movies,
+        movie_offsets=movie_offsets,
+        movie_people=movie_people,
+        name_order=name_order
+    )
+
+
+def measure(directory, queries=100, seed=0):
+    """
+    Loads `directory` both ways and returns memory (bytes retained after
+    loading) and mean query time (seconds) for the dicts and the Graph.
+    """
+    import degrees
+
+    tracemalloc.start()
+    degrees.load_data(directory)
+    dict_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    graph = load_graph(directory)
+    graph_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    person_ids = list(degrees.people)
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    for source, target in pairs:
+        degrees.shortest_path(source, target)
+    dict_time = (time.perf_counter() - start) / queries
+
+    start = time.perf_counter()
+    for source, target in pairs:
+        graph.shortest_path(source, target)
+    graph_time = (time.perf_counter() - start) / queries
+
+    return {
+        "dict_memory": dict_memory,
+        "graph_memory": graph_memory,
+        "dict_query_time": dict_time,
+        "graph_query_time": graph_time
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python graph.py [directory] [--queries N]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    print("Measuring...")
+    stats = measure(args.directory, args.queries)
+    print(f"Memory: dicts {stats['dict_memory'] / 2**20:.1f} MiB, "
+          f"graph {stats['graph_memory'] / 2**20:.1f} MiB")
+    print(f"Query:  dicts {stats['dict_query_time'] * 1000:.3f} ms, "
+          f"graph {stats['graph_query_time'] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Landmark (ALT) distance index for degrees.
+
+BFS distances from a few well-connected "landmark" people bound the
+distance between any two people through the triangle inequality:
+
+    |d(L, a) - d(L, b)| <= d(a, b) <= d(a, L) + d(L, b)
+
+The lower bound is infinite when exactly one of `a` and `b` is
+reachable from L, which answers many "not connected" queries outright.
+`shortest_path` uses the bounds to prune a live BFS: before expanding
+a person, one check against every landmark tells whether its depth plus
+its lower bound to the target exceeds the upper bound on the whole
+path, in which case it cannot be on a shortest path.
+"""
+
+import array
+import time
+
+# Distance stored for people a landmark cannot reach; larger than any
+# real distance, so it never shrinks a bound
+UNREACHABLE = 2 ** 31 - 1
+
+
+class LandmarkIndex():
+    """
+    BFS distances from each landmark to every person.
+    """
+
+    def __init__(self, person_ids, neighbors, landmarks, movies_of, stars_of, movie_id=None):
+        """
+        `person_ids`, a list, holds every person, `neighbors` computes the
+        (movie_id, person_id) neighbors of a person and `landmarks` are
+        the person_ids to index distances from. Searches run over the
+        movies: `movies_of` gives the movies of the person at a position,
+        `stars_of` the positions of a movie's stars and `movie_id`, if
+        movies are not their ids, the movie_id of a movie.
+        """
+        start = time.perf_counter()
+        self.neighbors = neighbors
+        self.movies_of = movies_of
+        self.stars_of = stars_of
+        self.movie_id = movie_id
+        self.person_ids = person_ids
+        self.landmarks = list(landmarks)
+        self.index = {person_id: i for i, person_id in enumerate(self.person_ids)}
+        self.distances = [self._bfs(landmark) for landmark in self.landmarks]
+        # Largest distance from each landmark (or more), capping its lower bounds
+        self.radii = [_radius(distances) for distances in self.distances]
+        self.build_time = time.perf_counter() - start
+
+        self.queries = 0
+        self.unreachable = 0
+        self.expanded = 0
+        self.pruned = 0
+
+    @classmethod
+    def from_dicts(cls, people, movies, neighbors, count):
+        """
+        Builds an index over the `count` people of the dict dataset with
+        the most co-star credits (cast sizes summed over their movies).
+        """
+        person_ids = list(people)
+        index = {person_id: i for i, person_id in enumerate(person_ids)}
+        cast_sizes = {movie_id: len(movie["stars"]) for movie_id, movie in movies.items()}
+        credits = [
+            sum(map(cast_sizes.__getitem__, people[person_id]["movies"]))
+            for person_id in person_ids
+        ]
+        landmark_index = cls(
+            person_ids, neighbors, _hubs(person_ids, credits, count),
+            lambda p: people[person_ids[p]]["movies"],
+            lambda movie_id: map(index.__getitem__, movies[movie_id]["stars"]))
+        # Shared with stars_of, so people added later are found there too
+        landmark_index.index = index
+        return landmark_index
+
+    @classmethod
+    def from_graph(cls, graph, neighbors, count):
+        """
+        Builds an index over the `count` people of a compact Graph with
+        the most co-star credits, searching its CSR arrays directly.
+        """
+        cast_sizes = array.array("i", (
+            graph.movie_offsets[m + 1] - graph.movie_offsets[m] for m in range(graph.num_movies)
+        ))
+        credits = [sum(map(cast_sizes.__getitem__, graph.movies_of(p)))
+                   for p in range(graph.num_people)]
+        person_ids = [graph.person_ids[p] for p in range(graph.num_people)]
+        return cls(person_ids, neighbors, _hubs(person_ids, credits, count),
+                   graph.movies_of, graph.stars_of, graph.movie_ids.__getitem__)
+
+    def _bfs(self, landmark):
+        distances = array.array("i", [UNREACHABLE]) * len(self.index)
+        distances[self.index[landmark]] = 0
+        movies_of = self.movies_of
+        stars_of = self.stars_of
+        seen_movies = set()
+        layer = [self.index[landmark]]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            for p in layer:
+                for movie in movies_of(p):
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for q in stars_of(movie):
+                        if distances[q] == UNREACHABLE:
+                            distances[q] = depth
+                            next_layer.append(q)
+            layer = next_layer
+        return distances
+
+    def add_person(self, person_id):
+        """
+        Starts tracking a new person, reachable from no landmark yet.
+        """
+        if person_id in self.index:
+            return
+        self.index[person_id] = len(self.index)
+        self.person_ids.append(person_id)
+        for distances in self.distances:
+            distances.append(UNREACHABLE)
+
+    def remove_person(self, person_id):
+        """
+        Stops using `person_id`, which must have no links left, as a
+        landmark or as a reachable person.
+        """
+        if person_id in self.landmarks:
+            position = self.landmarks.index(person_id)
+            del self.landmarks[position]
+            del self.distances[position]
+            del self.radii[position]
+        i = self.index.get(person_id)
+        if i is not None:
+            for distances in self.distances:
+                distances[i] = UNREACHABLE
+
+    def add_edges(self, edges):
+        """
+        Updates the distances after the (person_id, person_id) pairs in
+        `edges` became co-stars, propagating only the distances that shrink.
+        """
+        for position, distances in enumerate(self.distances):
+            farthest = self.radii[position]
+            changed = []
+            for a, b in edges:
+                for near, far in ((a, b), (b, a)):
+                    d = distances[self.index[near]]
+                    if d != UNREACHABLE and d + 1 < distances[self.index[far]]:
+                        distances[self.index[far]] = d + 1
+                        farthest = max(farthest, d + 1)
+                        changed.append(far)
+            while changed:
+                next_changed = []
+                for person_id in changed:
+                    d = distances[self.index[person_id]] + 1
+                    for _, neighbor in self.neighbors(person_id):
+                        i = self.index[neighbor]
+                        if d < distances[i]:
+                            distances[i] = d
+                            farthest = max(farthest, d)
+                            next_changed.append(neighbor)
+                changed = next_changed
+            self.radii[position] = farthest
+
+    def remove_edges(self, edges):
+        """
+        Updates the distances after the (person_id, person_id) pairs in
+        `edges` stopped being co-stars. A landmark is recomputed only if
+        one of those edges was the last link of a person to the layer
+        before it.
+        """
+        for position, distances in enumerate(self.distances):
+            if any(self._lost_parent(distances, a, b) for a, b in edges):
+                self.distances[position] = self._bfs(self.landmarks[position])
+                self.radii[position] = _radius(self.distances[position])
+
+    def _lost_parent(self, distances, a, b):
+        da = distances[self.index[a]]
+        db = distances[self.index[b]]
+        if da == db or UNREACHABLE in (da, db):
+            return False
+        near, far = (a, b) if da < db else (b, a)
+        level = distances[self.index[near]]
+        return not any(
+            distances[self.index[neighbor]] == level
+            for _, neighbor in self.neighbors(far)
+        )
+
+    def lower_bound(self, a, b):
+        """
+        Returns a lower bound on the degrees between `a` and `b`,
+        or None if they are certainly not connected.
+        """
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return 0
+        bound = 0
+        for distances in self.distances:
+            da = distances[i]
+            db = distances[j]
+            if (da == UNREACHABLE) != (db == UNREACHABLE):
+                return None
+            if da != UNREACHABLE:
+                bound = max(bound, abs(da - db))
+        return bound
+
+    def upper_bound(self, a, b):
+        """
+        Returns the length of the shortest a -> landmark -> b route,
+        or None if no landmark reaches both.
+        """
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return None
+        bound = None
+        for distances in self.distances:
+            da = distances[i]
+            db = distances[j]
+            if da != UNREACHABLE and db != UNREACHABLE:
+                if bound is None or da + db < bound:
+                    bound = da + db
+        return bound
+
+    def reachable(self, a, b):
+        """
+        Returns True or False when the landmarks settle whether `a` and
+        `b` are connected, or None when they cannot tell.
+        """
+        if self.lower_bound(a, b) is None:
+            return False
+        if self.upper_bound(a, b) is not None:
+            return True
+        return None
+
+    def pruner(self, source, target):
+        """
+        Returns a function `prune(p, depth)` telling whether the person at
+        position `p`, found `depth` steps from `source`, cannot be on a
+        shortest path to `target`, or None when the bounds cannot rule
+        anyone out.
+        """
+        limit = self.upper_bound(source, target)
+        if limit is None:
+            return None
+        j = self.index[target]
+        targets = [
+            (distances, distances[j])
+            for distances in self.distances if distances[j] != UNREACHABLE
+        ]
+        # No lower bound to the target exceeds `reach`, so nobody found
+        # fewer than `limit - reach` steps from the source is pruned
+        reach = max(
+            max(distances[j], radius - distances[j])
+            for distances, radius in zip(self.distances, self.radii)
+            if distances[j] != UNREACHABLE
+        )
+        # People are expanded at depths below `limit` only
+        first = limit - reach + 1
+        if first >= limit:
+            return None
+
+        def prune(p, depth):
+            if depth < first:
+                return False
+            slack = limit - depth
+            for distances, distance in targets:
+                # Also true when the landmark cannot reach p
+                if abs(distances[p] - distance) > slack:
+                    self.pruned += 1
+                    return True
+            return False
+        return prune
+
+    def shortest_path(self, source, target, stats=None, search=None):
+        """
+        Same contract as degrees.shortest_path. Answers pairs the
+        landmarks prove disconnected, otherwise runs a layered BFS from
+        `source` pruned by `pruner`. `search`, with the signature of
+        graph.Graph.shortest_path, replaces the built-in BFS over the
+        movies. `stats`, a util.SearchStats, is filled in when given.
+        """
+        self.queries += 1
+        if source == target:
+            if stats is not None:
+                stats.reached(0)
+            return []
+        if source not in self.index or target not in self.index:
+            return None
+        if self.lower_bound(source, target) is None:
+            if stats is not None:
+                stats.reached(0)
+            self.unreachable += 1
+            return None
+        prune = self.pruner(source, target)
+        if search is not None:
+            path = search(source, target, stats, prune)
+            if stats is not None:
+                self.expanded += stats.expanded
+            return path
+        if stats is not None:
+            stats.reached(0)
+
+        s = self.index[source]
+        t = self.index[target]
+        parents = {s: None}
+        seen_movies = set()
+        layer = [s]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            if stats is not None:
+                stats.frontier_peak = max(stats.frontier_peak, len(layer))
+            for p in layer:
+                if prune is not None and prune(p, depth - 1):
+                    continue
+                self.expanded += 1
+                if stats is not None:
+                    stats.expanded += 1
+                for movie in self.movies_of(p):
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for q in self.stars_of(movie):
+                        if q in parents:
+                            continue
+                        parents[q] = (movie, p)
+                        if q == t:
+                            if stats is not None:
+                                stats.reached(depth, len(next_layer) + 1)
+                            return self._path(parents, t)
+                        next_layer.append(q)
+            if stats is not None and next_layer:
+                stats.reached(depth, len(next_layer))
+            layer = next_layer
+        return None
+
+    def _path(self, parents, t):
+        movie_id = self.movie_id
+        path = []
+        step = parents[t]
+        q = t
+        while step is not None:
+            movie, p = step
+            path.append((movie if movie_id is None else movie_id(movie), self.person_ids[q]))
+            q = p
+            step = parents[q]
+        path.reverse()
+        return path
+
+    def stats(self):
+        return {
+            "landmarks": len(self.landmarks),
+            "build_time": self.build_time,
+            "queries": self.queries,
+            "unreachable": self.unreachable,
+            "expanded": self.expanded,
+            "pruned": self.pruned
+        }
+
+
+def _hubs(person_ids, credits, count):
+    """
+    Returns the `count` person_ids with the most credits.
+    """
+    ranked = sorted(range(len(person_ids)), key=credits.__getitem__, reverse=True)
+    return [person_ids[p] for p in ranked[:count]]
+
+
+def _radius(distances):
+    """
+    Returns the largest finite distance in `distances`.
+    """
+    return max(filter(UNREACHABLE.__ne__, distances), default=0)
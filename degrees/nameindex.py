@@ -0,0 +1,293 @@
+"""
+Prefix and fuzzy lookup of people by name.
+
+Distinct lowercased names are kept in a sorted list, so prefix queries
+are a bisect plus a short scan. Fuzzy queries go through a trigram
+index: an edit changes at most three trigrams of a name, so only names
+sharing enough trigrams with the query are scored with a bounded edit
+distance. Trigram postings list names in order of length, so a query
+only reads the slice of each posting within `max_distance` of its own
+length. Shared trigrams are counted over the shorter slices only; the
+candidates left are then looked up in the longest ones by bisection
+(the DivideSkip strategy), so common trigrams are never scanned.
+
+Short queries have too few trigrams to rule anything out. They use a
+deletion index instead (as in SymSpell): every name of at most
+`SHORT_NAME` characters is indexed under each string obtained by
+deleting up to `DELETIONS` of its characters, and two names within k
+edits always share such a string with at most k deletions from each.
+
+Names added after construction are appended past the sorted part and
+searched linearly until there are enough of them to re-sort everything.
+"""
+
+import array
+import bisect
+import collections
+import itertools
+
+# Names of at most this many characters are also in the deletion index
+SHORT_NAME = 8
+
+# Deletions indexed per short name, the largest distance it can answer
+DELETIONS = 2
+
+# Shared trigrams a fuzzy candidate needs among the postings counted;
+# the query's remaining, longest postings are only probed
+COUNTED_SHARES = 2
+
+_EMPTY = array.array("i")
+
+
+class NameIndex():
+    """
+    Maps lowercased names to person_ids, answering exact,
+    prefix and edit-distance queries.
+    """
+
+    def __init__(self, names):
+        """
+        `names` maps lowercased names to sets of person_ids,
+        like degrees.names.
+        """
+        self._build({name: names[name] for name in names})
+
+    def _build(self, names):
+        self.names = sorted(names)
+        self.person_ids = [tuple(sorted(names[name])) for name in self.names]
+        self.sorted_count = len(self.names)
+        # Positions of the names added since the last build
+        self.appended = {}
+
+        # Trigram postings hold ranks in (length, name) order, mapped back
+        # to positions by `by_length`; names appended later rank by position
+        self.by_length = array.array("i", sorted(
+            range(len(self.names)), key=lambda i: (len(self.names[i]), self.names[i])
+        ))
+        # length_starts[n] is the first rank of a name of n or more characters
+        longest = len(self.names[self.by_length[-1]]) if self.names else 0
+        self.length_starts = array.array("i", [len(self.names)]) * (longest + 2)
+        for rank in range(len(self.names) - 1, -1, -1):
+            self.length_starts[len(self.names[self.by_length[rank]])] = rank
+        for length in range(longest, -1, -1):
+            self.length_starts[length] = min(self.length_starts[length],
+                                             self.length_starts[length + 1])
+
+        postings = {}
+        self.deletions = {}
+        for rank, i in enumerate(self.by_length):
+            name = self.names[i]
+            for gram in set(trigrams(name)):
+                postings.setdefault(gram, []).append(rank)
+            if len(name) <= SHORT_NAME:
+                for variant in deletions(name, DELETIONS):
+                    self.deletions.setdefault(variant, []).append(i)
+        self.grams = {gram: array.array("i", ranks) for gram, ranks in postings.items()}
+
+    def __len__(self):
+        return sum(1 for person_ids in self.person_ids if person_ids)
+
+    def _position(self, name):
+        i = bisect.bisect_left(self.names, name, hi=self.sorted_count)
+        if i < self.sorted_count and self.names[i] == name:
+            return i
+        return self.appended.get(name)
+
+    def add(self, name, person_id):
+        """
+        Records that `person_id` is called `name`.
+        """
+        name = name.lower()
+        i = self._position(name)
+        if i is not None:
+            self.person_ids[i] = tuple(sorted(set(self.person_ids[i]) | {person_id}))
+            return
+        i = len(self.names)
+        self.names.append(name)
+        self.person_ids.append((person_id,))
+        self.appended[name] = i
+        self.by_length.append(i)
+        for gram in set(trigrams(name)):
+            self.grams.setdefault(gram, array.array("i")).append(i)
+        if len(name) <= SHORT_NAME:
+            for variant in deletions(name, DELETIONS):
+                self.deletions.setdefault(variant, []).append(i)
+        if len(self.appended) > max(1000, self.sorted_count // 10):
+            self._build({
+                name: person_ids
+                for name, person_ids in zip(self.names, self.person_ids)
+                if person_ids
+            })
+
+    def remove(self, name, person_id):
+        """
+        Forgets that `person_id` is called `name`.
+        """
+        i = self._position(name.lower())
+        if i is not None:
+            self.person_ids[i] = tuple(p for p in self.person_ids[i] if p != person_id)
+
+    def exact(self, name):
+        """
+        Returns the person_ids whose name is `name`, ignoring case.
+        """
+        i = self._position(name.lower())
+        if i is None:
+            return []
+        return list(self.person_ids[i])
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` (name, person_ids) pairs for names
+        starting with `prefix`, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        i = bisect.bisect_left(self.names, prefix, hi=self.sorted_count)
+        while i < self.sorted_count and len(matches) < limit and self.names[i].startswith(prefix):
+            if self.person_ids[i]:
+                matches.append((self.names[i], list(self.person_ids[i])))
+            i += 1
+        for name, i in self.appended.items():
+            if name.startswith(prefix) and self.person_ids[i]:
+                matches.append((name, list(self.person_ids[i])))
+        matches.sort()
+        return matches[:limit]
+
+    def fuzzy(self, name, max_distance=2, limit=10):
+        """
+        Returns up to `limit` (name, person_ids, distance) triples for
+        names within `max_distance` edits of `name`, closest first.
+        """
+        name = name.lower()
+        grams = set(trigrams(name))
+        required = len(grams) - 3 * max_distance
+        if max_distance <= DELETIONS and len(name) + max_distance <= SHORT_NAME:
+            # Every match is short enough to be in the deletion index
+            candidates = {
+                i for variant in deletions(name, max_distance)
+                for i in self.deletions.get(variant, ())
+            }
+        elif required > 0:
+            candidates = self._sharing(grams, required, len(name), max_distance)
+        else:
+            # Too short for trigrams to rule anything out
+            candidates = range(len(self.names))
+
+        matches = []
+        for i in candidates:
+            candidate = self.names[i]
+            if not self.person_ids[i] or abs(len(candidate) - len(name)) > max_distance:
+                continue
+            distance = edit_distance(name, candidate, max_distance)
+            if distance is not None:
+                matches.append((distance, candidate, i))
+        matches.sort()
+        return [(candidate, list(self.person_ids[i]), distance)
+                for distance, candidate, i in matches[:limit]]
+
+    def _sharing(self, grams, required, length, max_distance):
+        """
+        Returns the positions of the names within `max_distance`
+        characters of `length` that share at least `required` of `grams`.
+        """
+        starts = self.length_starts
+        last = len(starts) - 1
+        low = starts[min(max(length - max_distance, 0), last)]
+        high = starts[min(length + max_distance + 1, last)]
+        slices = []
+        for gram in grams:
+            posting = self.grams.get(gram, _EMPTY)
+            part = posting[bisect.bisect_left(posting, low):bisect.bisect_left(posting, high)]
+            if self.appended:
+                part += posting[bisect.bisect_left(posting, self.sorted_count):]
+            slices.append(part)
+        slices.sort(key=len)
+
+        # A name sharing `required` trigrams shares `counted` of them
+        # with the shorter slices, which hold every such name
+        probed = max(required - COUNTED_SHARES, 0)
+        counted = required - probed
+        longest = slices[len(slices) - probed:]
+        shared = collections.Counter(itertools.chain.from_iterable(slices[:len(slices) - probed]))
+        candidates = []
+        for rank, count in shared.items():
+            if count < counted:
+                continue
+            left = probed
+            for posting in longest:
+                j = bisect.bisect_left(posting, rank)
+                if j < len(posting) and posting[j] == rank:
+                    count += 1
+                left -= 1
+                if count + left < required:
+                    break
+            if count >= required:
+                candidates.append(self.by_length[rank])
+        return candidates
+
+
+def trigrams(name):
+    """
+    Returns the trigrams of `name`, padded so that its start
+    and end form trigrams too.
+    """
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def deletions(name, count):
+    """
+    Returns the set of strings obtained by deleting
+    up to `count` characters of `name`.
+    """
+    variants = {name}
+    layer = {name}
+    for _ in range(count):
+        layer = {word[:i] + word[i + 1:] for word in layer for i in range(len(word))}
+        variants |= layer
+    return variants
+
+
+def edit_distance(a, b, bound):
+    """
+    Returns the Levenshtein distance between `a` and `b`,
+    or None if it exceeds `bound`.
+
+    Bit-parallel (Myers, in Hyyro's formulation): bit i of `positive` /
+    `negative` is set when the distance to a[:i + 1] grows / shrinks
+    by one from a[:i], so each character of `b` updates a whole column
+    of the edit-distance table in a few integer operations.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return None
+    if not a:
+        return len(b)
+    masks = {}
+    for i, c in enumerate(a):
+        masks[c] = masks.get(c, 0) | 1 << i
+    full = (1 << len(a)) - 1
+    top = 1 << (len(a) - 1)
+    positive = full
+    negative = 0
+    distance = len(a)
+    remaining = len(b)
+    for c in b:
+        match = masks.get(c, 0)
+        vertical = match | negative
+        horizontal = (((match & positive) + positive) ^ positive) | match
+        grows = negative | (~(horizontal | positive) & full)
+        shrinks = positive & horizontal
+        if grows & top:
+            distance += 1
+        elif shrinks & top:
+            distance -= 1
+        remaining -= 1
+        # Each remaining character lowers the distance by at most one
+        if distance - remaining > bound:
+            return None
+        grows = (grows << 1 | 1) & full
+        shrinks = (shrinks << 1) & full
+        positive = shrinks | (~(vertical | grows) & full)
+        negative = grows & vertical
+    return distance if distance <= bound else None
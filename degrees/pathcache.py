@@ -0,0 +1,67 @@
+"""
+LRU cache of shortest_path results.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class PathCache():
+    """
+    Maps (source, target, mode) to the path found for it, keeping at
+    most `max_size` entries and evicting the least recently used.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Returns the cached path for `key`, calling `compute()` and caching
+        its result on a miss. Paths are handed out as fresh lists so
+        callers can modify them.
+        """
+        entries = self.entries
+        with self.lock:
+            if key in entries:
+                self.hits += 1
+                entries.move_to_end(key)
+                path = entries[key]
+                return None if path is None else list(path)
+            self.misses += 1
+
+        path = compute()
+        if path is not None:
+            path = tuple(path)
+        with self.lock:
+            entries[key] = path
+            if len(entries) > self.max_size:
+                entries.popitem(last=False)
+                self.evictions += 1
+        return None if path is None else list(path)
+
+    def invalidate(self, keep=None):
+        """
+        Drops every entry, or only those for which `keep(key, path)` is false.
+        """
+        with self.lock:
+            if keep is None:
+                self.entries.clear()
+                return
+            for key in [key for key, path in self.entries.items() if not keep(key, path)]:
+                del self.entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
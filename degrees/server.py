@@ -0,0 +1,256 @@
+"""
+Resident degrees query server.
+
+Loads the dataset once and answers shortest_path queries written as
+newline-delimited JSON, either on stdin/stdout or over a local socket.
+
+Requests (one JSON object per line):
+
+    {"id": 1, "source": "102", "target": "129"}
+    {"id": 2, "batch": [["102", "129"], ["102", "158"]], "mode": "bidirectional"}
+    {"id": 3, "lookup": "tom hnks"}
+    {"id": 4, "update": "add_star", "person_id": "102", "movie_id": "95953"}
+
+Every query produces one response line:
+
+    {"id": 1, "source": "102", "target": "129", "degrees": 1, "path": [["104257", "129"]]}
+
+`path` and `degrees` are null when the people are not connected. With
+"stats": true in the request, each result also carries the search's
+`stats` (expanded, frontier_peak, layers, elapsed).
+
+A lookup answers with the exact `matches` for a name, each with its id,
+name and birth, plus close `suggestions` when there are none and the
+server runs with --fuzzy.
+
+An update (add_person, remove_person, add_movie, remove_movie, add_star
+or remove_star, with the arguments of the functions in updates.py)
+answers {"id": ..., "update": ..., "ok": true}.
+
+Batch results are streamed back in order as they are computed, each
+carrying the batch `id` and its `index` in the batch. Malformed requests
+get {"id": ..., "error": "..."} instead.
+
+Usage: python server.py [directory] [options] [--socket PATH | --port PORT]
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+
+import degrees
+import updates
+
+# Number of batch results written between flushes
+FLUSH_EVERY = 256
+
+# Update functions by name, with their argument names
+UPDATES = {
+    "add_person": (updates.add_person, ("person_id", "name", "birth")),
+    "remove_person": (updates.remove_person, ("person_id",)),
+    "add_movie": (updates.add_movie, ("movie_id", "title", "year")),
+    "remove_movie": (updates.remove_movie, ("movie_id",)),
+    "add_star": (updates.add_star, ("person_id", "movie_id")),
+    "remove_star": (updates.remove_star, ("person_id", "movie_id"))
+}
+
+# Serializes queries and lookups with updates, which change the dataset
+# (and the name index) in place
+lock = threading.Lock()
+
+
+def query(source, target, mode="bfs", stats=False):
+    """
+    Answers one query as a response dict.
+    """
+    response = {"source": source, "target": target}
+    if not isinstance(source, str) or not isinstance(target, str):
+        response["error"] = "source and target must be strings"
+        return response
+    with lock:
+        if source not in degrees.people or target not in degrees.people:
+            response["error"] = "person not found"
+            return response
+        try:
+            path = degrees.shortest_path(source, target, mode=mode)
+        except Exception as e:
+            response["error"] = str(e)
+            return response
+        # None when the path cache answered without searching
+        searched = degrees.last_search
+    response["degrees"] = None if path is None else len(path)
+    response["path"] = path
+    if stats:
+        response["stats"] = None if searched is None else searched.as_dict()
+    return response
+
+
+def update(request):
+    """
+    Applies one update request, as a response dict.
+    """
+    name = request["update"]
+    if not isinstance(name, str) or name not in UPDATES:
+        return {"update": name, "error": f"unknown update: {name}"}
+    function, parameters = UPDATES[name]
+    arguments = {key: request[key] for key in parameters if key in request}
+    with lock:
+        try:
+            function(**arguments)
+        except (KeyError, TypeError, ValueError, RuntimeError) as e:
+            return {"update": name, "error": f"{type(e).__name__}: {e}"}
+    return {"update": name, "ok": True}
+
+
+def lookup(name):
+    """
+    Resolves a name without prompting, as a response dict.
+    """
+    def describe(person_id):
+        person = degrees.people[person_id]
+        return {"id": person_id, "name": person["name"], "birth": person["birth"]}
+
+    with lock:
+        matches = [
+            describe(person_id) for person_id in sorted(degrees.names.get(name.lower(), ()))
+        ]
+        suggestions = [] if matches else [
+            [describe(person_id) for person_id in person_ids]
+            for _, person_ids in degrees.suggest_names(name)
+        ]
+    return {"lookup": name, "matches": matches, "suggestions": suggestions}
+
+
+def handle(request):
+    """
+    Yields the response dicts for one decoded request.
+    """
+    if not isinstance(request, dict):
+        yield {"error": "request must be a JSON object"}
+        return
+    request_id = request.get("id")
+    mode = request.get("mode", "bfs")
+    stats = bool(request.get("stats", False))
+    if not isinstance(mode, str) or mode not in degrees.SEARCH_MODES:
+        yield {"id": request_id, "error": f"unknown search mode: {mode}"}
+        return
+
+    if "batch" in request:
+        if not isinstance(request["batch"], list):
+            yield {"id": request_id, "error": "batch must be a list of [source, target] pairs"}
+            return
+        for index, pair in enumerate(request["batch"]):
+            response = {"id": request_id, "index": index}
+            if not isinstance(pair, list) or len(pair) != 2:
+                response["error"] = "batch entries must be [source, target] pairs"
+            else:
+                response.update(query(pair[0], pair[1], mode, stats))
+            yield response
+    elif "update" in request:
+        yield {"id": request_id, **update(request)}
+    elif "lookup" in request:
+        yield {"id": request_id, **lookup(str(request["lookup"]))}
+    elif "source" in request and "target" in request:
+        yield {"id": request_id, **query(request["source"], request["target"], mode, stats)}
+    else:
+        yield {"id": request_id, "error": "request needs source and target, batch, lookup or update"}
+
+
+def serve_stream(infile, outfile):
+    """
+    Answers newline-delimited JSON requests from `infile` on `outfile`
+    until end of input. A request that fails unexpectedly gets an error
+    response and does not end the stream.
+    """
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            responses = [{"error": f"invalid JSON: {e}"}]
+        else:
+            responses = handle(request)
+        try:
+            for i, response in enumerate(responses, 1):
+                outfile.write(json.dumps(response) + "\n")
+                if i % FLUSH_EVERY == 0:
+                    outfile.flush()
+        except Exception as e:
+            request_id = request.get("id") if isinstance(request, dict) else None
+            outfile.write(json.dumps({"id": request_id, "error": f"{type(e).__name__}: {e}"}) + "\n")
+        outfile.flush()
+
+
+class StreamHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        infile = (line.decode("utf-8") for line in self.rfile)
+        serve_stream(infile, _TextWriter(self.wfile))
+
+
+class _TextWriter():
+    """
+    Minimal text wrapper around a socket's binary file.
+    """
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self):
+        self.wfile.flush()
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python server.py [directory] [options] [--socket PATH | --port PORT]")
+    degrees.add_arguments(parser)
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--socket", help="serve on a Unix domain socket at this path")
+    transport.add_argument("--port", type=int, help="serve on this TCP port on localhost")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.setup(args)
+    print("Data loaded.", file=sys.stderr)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        server = UnixServer(args.socket, StreamHandler)
+    elif args.port is not None:
+        server = TCPServer(("127.0.0.1", args.port), StreamHandler)
+    else:
+        serve_stream(sys.stdin, sys.stdout)
+        for line in degrees.report():
+            print(line, file=sys.stderr)
+        return
+
+    print(f"Serving on {args.socket or args.port}", file=sys.stderr)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    for line in degrees.report():
+        print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
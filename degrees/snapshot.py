@@ -0,0 +1,147 @@
+"""
+Binary snapshot cache for the compact degrees Graph.
+
+After the first CSV load the Graph's arrays are written to
+`{directory}/graph.snapshot`. Later starts memory-map that file and wrap
+its sections in memoryviews, so nothing is parsed or copied up front.
+The snapshot records the mtime and size of every CSV it was built from
+and is ignored (and rebuilt) as soon as any of them changes. It also
+keeps the connected component of every person, so later starts get the
+component index without a pass over the casts.
+"""
+
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+
+from components import ComponentIndex
+from graph import Graph, StringTable, load_graph
+
+MAGIC = b"DEGSNAP1"
+VERSION = 2
+FILENAME = "graph.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+STRING_TABLES = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+)
+ARRAYS = (
+    "person_offsets", "person_movies", "movie_offsets", "movie_people", "name_order",
+    "component_labels"
+)
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def fingerprint(directory):
+    """
+    Returns the (mtime_ns, size) of every CSV file in `directory`.
+    """
+    sources = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        sources[filename] = [stat.st_mtime_ns, stat.st_size]
+    return sources
+
+
+def load(directory):
+    """
+    Returns a Graph for `directory`, mapped from its snapshot when the
+    snapshot is still valid, otherwise loaded from CSV and snapshotted.
+    """
+    graph = read_snapshot(directory)
+    if graph is None:
+        graph = load_graph(directory)
+        write_snapshot(directory, graph)
+    return graph
+
+
+def write_snapshot(directory, graph, sources=None):
+    """
+    Writes `graph` to the snapshot file of `directory`. The file is
+    written next to the target and renamed into place, so readers never
+    see a partial snapshot.
+    """
+    if sources is None:
+        sources = fingerprint(directory)
+    if graph.component_labels is None:
+        graph.component_labels = ComponentIndex.from_graph(graph).labels()
+
+    buffers = {}
+    for name in STRING_TABLES:
+        table = getattr(graph, name)
+        buffers[f"{name}.offsets"] = ("q", memoryview(table.offsets).cast("B"))
+        buffers[f"{name}.data"] = ("B", memoryview(table.data).cast("B"))
+    for name in ARRAYS:
+        values = getattr(graph, name)
+        typecode = "q" if name.endswith("offsets") else "i"
+        if not isinstance(values, array.array):
+            values = array.array(typecode, values)
+        buffers[name] = (typecode, memoryview(values).cast("B"))
+
+    # Section offsets are relative to the (8-byte aligned) end of the header
+    sections = {}
+    position = 0
+    for name, (typecode, buffer) in buffers.items():
+        sections[name] = [position, len(buffer), typecode]
+        position = _align(position + len(buffer))
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "sources": sources,
+        "sections": sections
+    }).encode("utf-8")
+
+    path = snapshot_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<q", len(header)))
+        f.write(header)
+        f.write(bytes(_align(f.tell()) - f.tell()))
+        for name, (typecode, buffer) in buffers.items():
+            f.write(buffer)
+            f.write(bytes(_align(len(buffer)) - len(buffer)))
+    os.replace(temporary, path)
+
+
+def read_snapshot(directory):
+    """
+    Maps the snapshot of `directory` into a Graph, or returns None if
+    there is no snapshot or it is stale.
+    """
+    try:
+        f = open(snapshot_path(directory), "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        header_length, = struct.unpack("<q", f.read(8))
+        header = json.loads(f.read(header_length))
+        if (header["version"] != VERSION
+                or header["byteorder"] != sys.byteorder
+                or header["sources"] != fingerprint(directory)):
+            return None
+        base = _align(len(MAGIC) + 8 + header_length)
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    sections = {}
+    for name, (offset, length, typecode) in header["sections"].items():
+        section = view[base + offset:base + offset + length]
+        sections[name] = section if typecode == "B" else section.cast(typecode)
+
+    fields = {name: sections[name] for name in ARRAYS}
+    for name in STRING_TABLES:
+        fields[name] = StringTable(sections[f"{name}.offsets"], sections[f"{name}.data"])
+    return Graph(**fields)
+
+
+def _align(n):
+    return (n + 7) & ~7
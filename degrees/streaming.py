@@ -0,0 +1,118 @@
+"""
+Streaming, filtered loader for the degrees dataset.
+
+`load_filtered` reads the CSV files row by row in fixed-size chunks and
+only keeps what survives its filters, so a reduced graph (recent movies,
+prolific people) can be built without ever holding the full dataset.
+Working memory beyond the kept data is one chunk of rows plus a credit
+counter for the people in kept movies.
+"""
+
+import csv
+import itertools
+import os
+import sys
+
+# Rows processed between progress reports
+CHUNK_SIZE = 100000
+
+
+def load_filtered(directory, names, people, movies, min_year=None, max_year=None,
+                  min_credits=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Load data from CSV files into the `names`, `people` and `movies`
+    dicts (shaped like those of degrees.py), keeping only:
+
+    - movies whose year is within [min_year, max_year], when given,
+    - people with at least `min_credits` credits in kept movies, when
+      given, and
+    - the star links between kept people and kept movies.
+
+    `progress(filename, rows, fraction)` is called after every chunk.
+    """
+    # Load movies
+    for row in _rows(directory, "movies.csv", chunk_size, progress):
+        if not _year_in_range(row["year"], min_year, max_year):
+            continue
+        movies[row["id"]] = {
+            "title": row["title"],
+            "year": row["year"],
+            "stars": set()
+        }
+
+    # Count credits in kept movies, to know which people to keep
+    credits = None
+    if min_credits is not None:
+        credits = {}
+        for row in _rows(directory, "stars.csv", chunk_size, progress):
+            if row["movie_id"] in movies:
+                credits[row["person_id"]] = credits.get(row["person_id"], 0) + 1
+
+    # Load people
+    for row in _rows(directory, "people.csv", chunk_size, progress):
+        if credits is not None and credits.get(row["id"], 0) < min_credits:
+            continue
+        people[row["id"]] = {
+            "name": row["name"],
+            "birth": row["birth"],
+            "movies": set()
+        }
+        names.setdefault(row["name"].lower(), set()).add(row["id"])
+    credits = None
+
+    # Load stars
+    for row in _rows(directory, "stars.csv", chunk_size, progress):
+        person = people.get(row["person_id"])
+        movie = movies.get(row["movie_id"])
+        if person is not None and movie is not None:
+            person["movies"].add(row["movie_id"])
+            movie["stars"].add(row["person_id"])
+
+
+def _rows(directory, filename, chunk_size, progress):
+    """
+    Yields the rows of one CSV file as dicts, reading it in chunks of
+    `chunk_size` rows and reporting progress after each chunk.
+    """
+    path = os.path.join(directory, filename)
+    total = os.path.getsize(path) or 1
+    consumed = 0
+
+    with open(path, "rb") as f:
+        def lines():
+            nonlocal consumed
+            for line in f:
+                consumed += len(line)
+                yield line.decode("utf-8")
+
+        reader = csv.DictReader(lines())
+        rows = 0
+        while True:
+            chunk = list(itertools.islice(reader, chunk_size))
+            if not chunk:
+                break
+            rows += len(chunk)
+            yield from chunk
+            if progress is not None:
+                progress(filename, rows, consumed / total)
+
+
+def _year_in_range(year, min_year, max_year):
+    if min_year is None and max_year is None:
+        return True
+    try:
+        year = int(year)
+    except ValueError:
+        return False
+    if min_year is not None and year < min_year:
+        return False
+    if max_year is not None and year > max_year:
+        return False
+    return True
+
+
+def print_progress(filename, rows, fraction):
+    """
+    Progress callback writing one line per chunk to stderr.
+    """
+    print(f"  {filename}: {fraction:.0%} ({rows} rows)", file=sys.stderr)
@@ -0,0 +1,194 @@
+"""
+Incremental updates to a loaded degrees dataset.
+
+These functions change `degrees.names`, `people` and `movies` in place
+and keep every enabled index consistent, touching only what the change
+affects:
+
+- the name index gets the added or removed name,
+- the co-star index forgets the people whose co-stars changed,
+- components merge on new links and are marked dirty on lost ones,
+- landmark distances are patched (see LandmarkIndex.add_edges and
+  remove_edges), and
+- the path cache drops only results the change can make wrong.
+
+Removing a link invalidates exactly the cached paths that step through
+that movie next to that person, since removals never make other paths
+shorter. Adding links can shorten any path, so cached hop-count results
+are kept only when landmark bounds prove that no new edge can beat
+them; without landmarks, and for the weighted modes, they are dropped.
+
+Updates need the dict representation; a compact Graph is read-only.
+Every update checks its arguments before changing anything, so one that
+raises leaves the dataset and the indexes as they were.
+"""
+
+import degrees
+
+
+def add_person(person_id, name, birth=""):
+    _check_mutable()
+    _check_strings(person_id=person_id, name=name, birth=birth)
+    if person_id in degrees.people:
+        raise ValueError(f"person already exists: {person_id}")
+    degrees.people[person_id] = {"name": name, "birth": birth, "movies": set()}
+    degrees.names.setdefault(name.lower(), set()).add(person_id)
+    if degrees.name_index is not None:
+        degrees.name_index.add(name, person_id)
+    if degrees.landmarks is not None:
+        degrees.landmarks.add_person(person_id)
+    if degrees.components is not None:
+        degrees.components.add_person(person_id)
+
+
+def remove_person(person_id):
+    _check_mutable()
+    person = degrees.people[person_id]
+    for movie_id in list(person["movies"]):
+        remove_star(person_id, movie_id)
+
+    name = person["name"].lower()
+    degrees.names[name].discard(person_id)
+    if not degrees.names[name]:
+        del degrees.names[name]
+    del degrees.people[person_id]
+    if degrees.name_index is not None:
+        degrees.name_index.remove(name, person_id)
+    if degrees.landmarks is not None:
+        degrees.landmarks.remove_person(person_id)
+    if degrees.costars is not None:
+        degrees.costars.invalidate([person_id])
+    if degrees.path_cache is not None:
+        degrees.path_cache.invalidate(lambda key, path: person_id not in key[:2])
+
+
+def add_movie(movie_id, title, year=""):
+    _check_mutable()
+    _check_strings(movie_id=movie_id, title=title, year=year)
+    if movie_id in degrees.movies:
+        raise ValueError(f"movie already exists: {movie_id}")
+    degrees.movies[movie_id] = {"title": title, "year": year, "stars": set()}
+
+
+def remove_movie(movie_id):
+    _check_mutable()
+    for person_id in list(degrees.movies[movie_id]["stars"]):
+        remove_star(person_id, movie_id)
+    del degrees.movies[movie_id]
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that `person_id` starred in `movie_id`.
+    """
+    _check_mutable()
+    person = degrees.people[person_id]
+    stars = degrees.movies[movie_id]["stars"]
+    if person_id in stars:
+        return
+    new_edges = [
+        (person_id, other) for other in stars
+        if other != person_id and _costars(person_id, other) == set()
+    ]
+    person["movies"].add(movie_id)
+    stars.add(person_id)
+
+    _invalidate_costars(person_id, stars)
+    if degrees.components is not None:
+        for _, other in new_edges:
+            degrees.components.link(person_id, other)
+    if degrees.landmarks is not None:
+        degrees.landmarks.add_edges(new_edges)
+    if degrees.path_cache is not None:
+        degrees.path_cache.invalidate(lambda key, path: _survives_addition(key, path, new_edges))
+
+
+def remove_star(person_id, movie_id):
+    """
+    Records that `person_id` did not star in `movie_id` after all.
+    """
+    _check_mutable()
+    person = degrees.people[person_id]
+    stars = degrees.movies[movie_id]["stars"]
+    if person_id not in stars:
+        return
+    person["movies"].discard(movie_id)
+    stars.discard(person_id)
+    lost_edges = [
+        (person_id, other) for other in stars
+        if _costars(person_id, other) == set()
+    ]
+
+    _invalidate_costars(person_id, stars)
+    if degrees.components is not None and lost_edges:
+        degrees.components.unlink(person_id)
+    if degrees.landmarks is not None:
+        degrees.landmarks.remove_edges(lost_edges)
+    if degrees.path_cache is not None:
+        degrees.path_cache.invalidate(
+            lambda key, path: _survives_removal(key, path, person_id, movie_id))
+
+
+def _check_mutable():
+    if degrees.graph is not None:
+        raise RuntimeError("the compact graph is read-only; load the dataset without --compact to update it")
+
+
+def _check_strings(**arguments):
+    for key, value in arguments.items():
+        if not isinstance(value, str):
+            raise TypeError(f"{key} must be a string, not {type(value).__name__}")
+
+
+def _costars(a, b):
+    """
+    Returns the movies both `a` and `b` starred in.
+    """
+    return degrees.people[a]["movies"] & degrees.people[b]["movies"]
+
+
+def _invalidate_costars(person_id, stars):
+    if degrees.costars is not None:
+        degrees.costars.invalidate([person_id, *stars])
+
+
+def _survives_removal(key, path, person_id, movie_id):
+    """
+    Whether a cached result stays correct once `person_id` left the cast
+    of `movie_id`: it does unless the path steps through that movie next
+    to that person, or a weighted path uses the movie (its cost changed).
+    """
+    source, _, mode = key
+    if path is None:
+        return True
+    previous = source
+    for step_movie, step_person in path:
+        if step_movie == movie_id:
+            if mode in degrees.MOVIE_COSTS or person_id in (previous, step_person):
+                return False
+        previous = step_person
+    return True
+
+
+def _survives_addition(key, path, new_edges):
+    """
+    Whether a cached result stays correct after `new_edges` appeared:
+    only hop-count results the landmark bounds can vouch for do.
+    """
+    source, target, mode = key
+    if mode in degrees.MOVIE_COSTS or degrees.landmarks is None:
+        return False
+    if path is not None and len(path) <= 1:
+        return True
+    length = None if path is None else len(path)
+    bound = degrees.landmarks.lower_bound
+    for a, b in new_edges:
+        for near, far in ((a, b), (b, a)):
+            before = bound(source, near)
+            after = bound(far, target)
+            if before is None or after is None:
+                # The new edge cannot join source to target this way
+                continue
+            if length is None or before + 1 + after < length:
+                return False
+    return True
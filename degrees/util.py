@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -5,6 +8,32 @@ class Node():
         self.action = action
 
 
+class SearchStats():
+    """
+    Counters filled in by a search: people expanded, largest frontier,
+    number of people first reached at each depth, and wall time.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.frontier_peak = 0
+        self.layers = []
+        self.elapsed = 0.0
+
+    def reached(self, depth, count=1):
+        while len(self.layers) <= depth:
+            self.layers.append(0)
+        self.layers[depth] += count
+
+    def as_dict(self):
+        return {
+            "expanded": self.expanded,
+            "frontier_peak": self.frontier_peak,
+            "layers": list(self.layers),
+            "elapsed": self.elapsed
+        }
+
+
 class StackFrontier():
     def __init__(self):
         self.frontier = []
@@ -36,3 +65,49 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Drop-in replacement for StackFrontier with constant time
+    add, remove and contains_state. Nodes live in a deque and the
+    states currently on the frontier are counted in a dict.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self._pop()
+            self._forget(node.state)
+            return node
+
+    def _pop(self):
+        return self.frontier.pop()
+
+    def _forget(self, state):
+        count = self.states[state] - 1
+        if count:
+            self.states[state] = count
+        else:
+            del self.states[state]
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def _pop(self):
+        return self.frontier.popleft()
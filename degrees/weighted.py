@@ -0,0 +1,168 @@
+"""
+Weighted path search for degrees.
+
+Instead of the fewest movies, `cheapest_path` finds the path whose
+movies have the lowest total cost, where a movie's cost comes from its
+year and cast size (see `recency_cost` and `popularity_cost`). It is
+bidirectional Dijkstra over two binary heaps without decrease-key:
+improved people are pushed again and stale heap entries are skipped
+when popped. Heap entries are movies rather than people: every star of
+a movie is reached at the same cost, so popping a movie settles its
+whole cast and a person with many co-stars costs one push per movie.
+The side with the smaller heap is expanded, and the search stops once
+the two cheapest open costs add up to the best path found where the
+sides met, at a person or through a movie both entered.
+
+Every cost is at least 1, so any lower bound on the number of movies
+between two people is also a lower bound on their cost; given one, the
+search from the source skips people who cannot improve on that path.
+"""
+
+import datetime
+import heapq
+import itertools
+
+# Stands in for a movie no search has entered yet
+_UNSEEN = (float("inf"), None)
+
+
+def recency_cost(reference_year=None, scale=10.0, unknown=10.0):
+    """
+    Returns a cost function preferring recent movies: 1 plus one unit
+    per `scale` years before `reference_year` (this year by default).
+    Movies without a year cost 1 + `unknown`.
+    """
+    if reference_year is None:
+        reference_year = datetime.date.today().year
+
+    def cost(year, cast_size):
+        if year is None:
+            return 1.0 + unknown
+        return 1.0 + max(0, reference_year - year) / scale
+    return cost
+
+
+def popularity_cost(scale=10.0):
+    """
+    Returns a cost function penalizing obscure movies: 1 plus `scale`
+    divided by the cast size, so small casts cost more.
+    """
+    def cost(year, cast_size):
+        return 1.0 + scale / max(cast_size, 1)
+    return cost
+
+
+def parse_year(year):
+    """
+    Returns `year` as an int, or None when it is missing or malformed.
+    """
+    try:
+        return int(year)
+    except (TypeError, ValueError):
+        return None
+
+
+def cheapest_path(source, target, movies_of, stars_of, movie_cost,
+                  heuristic=None, stats=None):
+    """
+    Returns the cheapest list of (movie, person) pairs connecting
+    `source` to `target`, or None if there is no path.
+
+    `movies_of(person)` and `stars_of(movie)` describe the graph and
+    `movie_cost(movie)` gives the cost (at least 1) of going through a
+    movie. `heuristic(person)`, if given, is a lower bound on the cost
+    from that person to the target, or None when the target is certainly
+    unreachable from them. `stats`, a util.SearchStats, is filled in
+    when given; its layers count people settled per whole unit of cost
+    from either end.
+    """
+    if stats is not None:
+        stats.reached(0)
+    if source == target:
+        return []
+    if heuristic is not None and heuristic(source) is None:
+        return None
+
+    counter = itertools.count()
+    # Index 0 holds the search from the source, 1 the one from the target.
+    # People are settled at their final cost; movies map to the cheapest
+    # (cost after the movie, person entering it) seen so far.
+    settled = ({}, {})
+    entered = ({}, {})
+    parents = ({source: None}, {target: None})
+    heaps = ([(0.0, next(counter), None, source)], [(0.0, next(counter), None, target)])
+    cheapest = float("inf")
+    meeting = None
+
+    while heaps[0] and heaps[1]:
+        if stats is not None:
+            stats.frontier_peak = max(stats.frontier_peak, len(heaps[0]) + len(heaps[1]))
+        # Every path left to find costs at least the sum of the two minima
+        if heaps[0][0][0] + heaps[1][0][0] >= cheapest:
+            break
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        cost, _, movie, person = heapq.heappop(heaps[side])
+        if movie is None:
+            stars = (person,)
+        elif entered[side][movie][0] < cost:
+            # Stale entry left behind by a cheaper push
+            continue
+        else:
+            stars = stars_of(movie)
+
+        done, other = settled[side], settled[1 - side]
+        for star in stars:
+            if star in done:
+                continue
+            # Popped in order of cost, so no later movie reaches star cheaper
+            done[star] = cost
+            if movie is not None:
+                parents[side][star] = (movie, person)
+            if stats is not None:
+                stats.expanded += 1
+                stats.reached(int(cost))
+            if star in other and cost + other[star] < cheapest:
+                cheapest = cost + other[star]
+                meeting = (star, None, star)
+            if side == 0 and heuristic is not None:
+                bound = heuristic(star)
+                if bound is None or cost + bound >= cheapest:
+                    continue
+            for next_movie in movies_of(star):
+                step = movie_cost(next_movie)
+                total = cost + step
+                if total >= cheapest or total >= entered[side].get(next_movie, _UNSEEN)[0]:
+                    continue
+                entered[side][next_movie] = (total, star)
+                heapq.heappush(heaps[side], (total, next(counter), next_movie, star))
+                # A path through a movie both sides entered
+                theirs = entered[1 - side].get(next_movie)
+                if theirs is not None and total + theirs[0] - step < cheapest:
+                    cheapest = total + theirs[0] - step
+                    if side == 0:
+                        meeting = (star, next_movie, theirs[1])
+                    else:
+                        meeting = (theirs[1], next_movie, star)
+
+    if meeting is None:
+        return None
+    first, movie, last = meeting
+    path = _path(parents[0], first)
+    if movie is not None:
+        path.append((movie, last))
+    person = last
+    while parents[1][person] is not None:
+        movie, person = parents[1][person]
+        path.append((movie, person))
+    return path
+
+
+def _path(parents, target):
+    path = []
+    person = target
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
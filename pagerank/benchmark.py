@@ -0,0 +1,125 @@
+"""
+Benchmark of the PageRank solvers on bundled and synthetic corpora.
+
+    python benchmark.py [corpus ...] [--pages N ...] [--methods M ...] [--tolerance T]
+
+Every solver in solvers.SOLVERS runs on each corpus directory (corpus0,
+corpus1 and corpus2 by default) and on synthetic graphs of the given
+sizes, and the benchmark reports iterations, work in sweeps, wall time
+and the largest difference from a reference solution computed by power
+iteration at a much tighter tolerance.
+
+Synthetic graphs have power-law out-degrees and preferential targets,
+and a share of pages without links, like crawled web graphs.
+"""
+
+import argparse
+import array
+import json
+import operator
+import os
+import random
+import time
+
+import linkstore
+from linkgraph import NORMS, ConvergenceStats, LinkGraph, power_iteration
+from solvers import SOLVERS
+
+CORPORA = ("corpus0", "corpus1", "corpus2")
+
+
+def synthetic_graph(pages, mean_links=8, exponent=2.5, dangling=0.1,
+                    concentration=2.0, seed=0):
+    """
+    Returns a random LinkGraph of `pages` pages. Out-degrees follow a
+    Pareto distribution with shape `exponent - 1` scaled to a mean of
+    `mean_links` (when finite), a `dangling` share of pages has no
+    links, and targets are drawn with density decreasing in a random
+    popularity order, sharper for larger `concentration`.
+    """
+    rng = random.Random(seed)
+    # Random popularity order so that page indices carry no information
+    ranking = list(range(pages))
+    rng.shuffle(ranking)
+    shape = exponent - 1
+    # The Pareto mean is scale * shape / (shape - 1), infinite for shape <= 1
+    scale = mean_links * (shape - 1) / shape if shape > 1 else 1.0
+
+    offsets = array.array("q", [0])
+    links = array.array("i")
+    for page in range(pages):
+        if rng.random() >= dangling:
+            degree = min(pages - 1, max(1, int(scale * rng.paretovariate(shape))))
+            targets = {ranking[int(pages * rng.random() ** (1 + concentration))]
+                       for _ in range(degree)}
+            targets.discard(page)
+            links.extend(sorted(targets))
+        offsets.append(len(links))
+    return LinkGraph([f"{page}.html" for page in range(pages)], offsets, links)
+
+
+def compare(graph, methods, damping, tolerance, norm, max_iterations):
+    """
+    Runs `methods` on `graph` and returns one dict of measurements each.
+    """
+    reference = power_iteration(graph, damping, tolerance * 1e-4, norm, max_iterations * 10)
+    results = []
+    for method in methods:
+        stats = ConvergenceStats()
+        start = time.perf_counter()
+        ranks = SOLVERS[method](graph, damping, tolerance, norm, max_iterations, stats)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "method": method,
+            "iterations": stats.iterations,
+            "converged": stats.converged,
+            "work": stats.work,
+            "time": elapsed,
+            "error": max(map(abs, map(operator.sub, ranks, reference)), default=0.0)
+        })
+    return results
+
+
+def main():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [corpus ...] [--pages N ...] [--methods M ...] [--tolerance T]")
+    parser.add_argument("corpora", nargs="*",
+                        default=[os.path.join(directory, corpus) for corpus in CORPORA])
+    parser.add_argument("--pages", type=int, nargs="*", default=[10000, 50000],
+                        help="sizes of the synthetic graphs")
+    parser.add_argument("--methods", choices=SOLVERS, nargs="+", default=list(SOLVERS))
+    parser.add_argument("--damping", type=float, default=0.85)
+    parser.add_argument("--tolerance", type=float, default=1e-8)
+    parser.add_argument("--norm", choices=NORMS, default="l1")
+    parser.add_argument("--max-iterations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    graphs = [(os.path.basename(corpus), lambda corpus=corpus: linkstore.load(corpus))
+              for corpus in args.corpora]
+    graphs += [(f"synthetic-{pages}", lambda pages=pages: synthetic_graph(pages, seed=args.seed))
+               for pages in args.pages]
+
+    report = []
+    for name, load in graphs:
+        graph = load()
+        results = compare(graph, args.methods, args.damping, args.tolerance, args.norm,
+                          args.max_iterations)
+        report.append({"graph": name, "pages": len(graph), "links": len(graph.links),
+                       "results": results})
+        if args.json:
+            continue
+        print(f"{name}: {len(graph)} pages, {len(graph.links)} links")
+        for result in results:
+            flag = "" if result["converged"] else " (iteration cap)"
+            print(f"  {result['method']:<13} {result['iterations']:>5} iterations "
+                  f"{result['work']:>8.2f} sweeps {result['time'] * 1000:>10.1f} ms "
+                  f"max error {result['error']:.1e}{flag}")
+    if args.json:
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
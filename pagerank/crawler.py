@@ -0,0 +1,155 @@
+"""
+Parallel crawler building a LinkGraph straight from a corpus directory.
+
+Each `.html` file is scanned for links by a bytes regex; files past
+`MMAP_THRESHOLD` are memory-mapped rather than read, so a large file is
+never copied into memory. Files are parsed by a multiprocessing pool;
+as results stream back, the parent interns every page name to an
+integer ID and appends the links to flat arrays, so the corpus is never
+held as a dict of sets. Links to files outside
+the corpus are dropped when the final CSR is built.
+
+Usage: python crawler.py corpus [--workers W]
+"""
+
+import argparse
+import array
+import mmap
+import multiprocessing
+import os
+import re
+
+from linkgraph import LinkGraph
+
+# Same links as pagerank.crawl's original pattern, without the overlap
+# between `\s+` and `[^>]*?` that made it backtrack over whitespace
+LINK = re.compile(rb"<a\s[^>]*?href=\"([^\"]*)\"")
+
+# Files at least this large are memory-mapped instead of read
+MMAP_THRESHOLD = 1 << 16
+
+# Files handed to a pool worker at a time
+CHUNK_SIZE = 64
+
+
+def extract_links(path):
+    """
+    Returns the distinct link targets in the file at `path`, as names.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        if size < MMAP_THRESHOLD:
+            targets = set(LINK.findall(f.read()))
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+                targets = {match.group(1) for match in LINK.finditer(contents)}
+    return [os.fsdecode(target) for target in targets]
+
+
+def _parse(job):
+    directory, filename = job
+    return filename, extract_links(os.path.join(directory, filename))
+
+
+def parse_files(directory, filenames, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields (filename, link targets) for each of `filenames` in
+    `directory`, in any order, parsed by `workers` processes (one per
+    CPU by default, none when 1).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    jobs = [(directory, filename) for filename in filenames]
+    if workers <= 1 or len(jobs) <= chunk_size:
+        yield from map(_parse, jobs)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(_parse, jobs, chunk_size)
+
+
+def crawl_graph(directory, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Crawls the `.html` files of `directory` and returns their LinkGraph.
+    """
+    filenames = [filename for filename in os.listdir(directory) if filename.endswith(".html")]
+    return build_graph(filenames, parse_files(directory, filenames, workers, chunk_size))
+
+
+def build_graph(filenames, parsed):
+    """
+    Builds a LinkGraph over `filenames` from (filename, link targets)
+    pairs arriving in any order. Names are interned as they arrive;
+    targets that are not in `filenames` and self-links are dropped.
+    """
+    return build_link_tables(filenames, parsed)[0]
+
+
+def build_link_tables(filenames, parsed):
+    """
+    Like build_graph, but returns (graph, outside) where `outside` keeps
+    the dropped targets as (names, offsets, links): the targets outside
+    the corpus of page `i` are `names[t]` for `t` in
+    `links[offsets[i]:offsets[i + 1]]`.
+    """
+    ids = {}
+    sources = array.array("i")
+    starts = array.array("q")
+    targets = array.array("i")
+    for filename, links in parsed:
+        sources.append(ids.setdefault(filename, len(ids)))
+        starts.append(len(targets))
+        targets.extend(ids.setdefault(link, len(ids)) for link in links)
+    starts.append(len(targets))
+
+    # Renumber pages by name, like LinkGraph.from_corpus; outside names get
+    # negative positions, -1 - (their index among outside names)
+    names = sorted(filenames)
+    position = array.array("i", [0]) * len(ids)
+    for page, name in enumerate(names):
+        position[ids[name]] = page + 1
+    outside_names = []
+    for name, i in ids.items():
+        if position[i] == 0:
+            outside_names.append(name)
+            position[i] = -len(outside_names)
+    slot = array.array("i", [-1]) * len(names)
+    for i, source in enumerate(sources):
+        slot[position[source] - 1] = i
+
+    offsets = array.array("q", [0])
+    links = array.array("i")
+    outside_offsets = array.array("q", [0])
+    outside_links = array.array("i")
+    for page in range(len(names)):
+        i = slot[page]
+        found = map(position.__getitem__, targets[starts[i]:starts[i + 1]])
+        inside = []
+        for target in found:
+            if target > 0:
+                if target != page + 1:
+                    inside.append(target - 1)
+            else:
+                outside_links.append(-1 - target)
+        inside.sort()
+        links.extend(inside)
+        offsets.append(len(links))
+        outside_offsets.append(len(outside_links))
+    graph = LinkGraph(names, offsets, links)
+    return graph, (outside_names, outside_offsets, outside_links)
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python crawler.py corpus [--workers W]")
+    parser.add_argument("corpus")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    graph = crawl_graph(args.corpus, args.workers)
+    print(f"{len(graph)} pages, {len(graph.links)} links, "
+          f"{len(graph.dangling())} without links")
+
+
+if __name__ == "__main__":
+    main()
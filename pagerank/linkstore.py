@@ -0,0 +1,273 @@
+"""
+Persistent binary link graph for PageRank corpora.
+
+After a crawl the LinkGraph of a corpus is written to
+`{corpus}/links.graph`: a JSON header followed by 8-byte aligned
+sections holding the page-name table, the out-link and in-link CSR
+arrays, the links to names outside the corpus and the mtime and size of
+every page. Later runs memory-map the file and wrap its sections in
+memoryviews, so nothing is parsed or copied up front.
+
+When files were added, removed or modified since, only the files whose
+mtime or size changed are parsed again; the links of the others come
+from the store (including links to names outside the corpus, which
+become real links once a file of that name appears). The store is then
+rewritten.
+
+Usage: python linkstore.py corpus [--workers W] [--rebuild]
+"""
+
+import argparse
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import crawler
+from linkgraph import LinkGraph
+
+MAGIC = b"PRLINKS1"
+VERSION = 1
+FILENAME = "links.graph"
+
+STRING_TABLES = ("names", "outside_names")
+ARRAYS = (
+    ("offsets", "q"),
+    ("links", "i"),
+    ("in_offsets", "q"),
+    ("in_sources", "i"),
+    ("outside_offsets", "q"),
+    ("outside_links", "i"),
+    ("mtimes", "q"),
+    ("sizes", "q")
+)
+
+
+class StringTable():
+    """
+    Immutable sequence of strings stored as one UTF-8 buffer
+    plus an offsets array.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array.array("q", [0])
+        data = bytearray()
+        for string in strings:
+            data += string.encode("utf-8", "surrogateescape")
+            offsets.append(len(data))
+        return cls(offsets, bytes(data))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8", "surrogateescape")
+
+
+class LinkStore():
+    """
+    Contents of a store file: the LinkGraph, the links to names outside
+    the corpus and the (mtime_ns, size) of every page.
+    """
+
+    def __init__(self, graph, outside_names, outside_offsets, outside_links, mtimes, sizes):
+        self.graph = graph
+        self.outside_names = outside_names
+        self.outside_offsets = outside_offsets
+        self.outside_links = outside_links
+        self.mtimes = mtimes
+        self.sizes = sizes
+
+    def targets_of(self, page):
+        """
+        Returns the names of every target of `page`, in the corpus or not.
+        """
+        graph = self.graph
+        targets = [graph.names[link] for link in graph.links_of(page)]
+        start = self.outside_offsets[page]
+        end = self.outside_offsets[page + 1]
+        targets.extend(self.outside_names[link] for link in self.outside_links[start:end])
+        return targets
+
+
+def store_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def fingerprint(directory):
+    """
+    Returns a dict mapping every `.html` file of `directory` to its
+    (mtime_ns, size).
+    """
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html"):
+                stat = entry.stat()
+                files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def load(directory, workers=None, stats=None):
+    """
+    Returns the LinkGraph of `directory`, mapped from its store when no
+    page changed, otherwise re-crawling only the changed files and
+    rewriting the store. `stats`, a dict, receives how many files were
+    reused, parsed and removed.
+    """
+    files = fingerprint(directory)
+    store = read_store(directory)
+    if store is None:
+        changed = sorted(files)
+        reused = {}
+    else:
+        names = store.graph.names
+        reused = {}
+        for page in range(len(names)):
+            name = names[page]
+            if files.get(name) == (store.mtimes[page], store.sizes[page]):
+                reused[name] = page
+        changed = [name for name in files if name not in reused]
+    if stats is not None:
+        stats["reused"] = len(reused)
+        stats["parsed"] = len(changed)
+        stats["removed"] = 0 if store is None else sum(
+            1 for name in store.graph.names if name not in files
+        )
+
+    if store is not None and not changed and len(reused) == len(store.graph):
+        return store.graph
+
+    def parsed():
+        for name, page in reused.items():
+            yield name, store.targets_of(page)
+        yield from crawler.parse_files(directory, changed, workers)
+
+    graph, outside = crawler.build_link_tables(list(files), parsed())
+    write_store(directory, graph, outside, files)
+    return graph
+
+
+def write_store(directory, graph, outside, files):
+    """
+    Writes `graph`, the `outside` tables from crawler.build_link_tables
+    and the `files` fingerprint to the store of `directory`. The file is
+    written next to the target and renamed into place, so readers never
+    see a partial store.
+    """
+    outside_names, outside_offsets, outside_links = outside
+    in_offsets, in_sources = graph.in_links()
+    fields = {
+        "offsets": graph.offsets,
+        "links": graph.links,
+        "in_offsets": in_offsets,
+        "in_sources": in_sources,
+        "outside_offsets": outside_offsets,
+        "outside_links": outside_links,
+        "mtimes": [files[name][0] for name in graph.names],
+        "sizes": [files[name][1] for name in graph.names]
+    }
+
+    buffers = {}
+    for name, strings in (("names", graph.names), ("outside_names", outside_names)):
+        table = strings if isinstance(strings, StringTable) else StringTable.from_strings(strings)
+        buffers[f"{name}.offsets"] = ("q", memoryview(table.offsets).cast("B"))
+        buffers[f"{name}.data"] = ("B", memoryview(table.data).cast("B"))
+    for name, typecode in ARRAYS:
+        values = fields[name]
+        if not isinstance(values, (array.array, memoryview)):
+            values = array.array(typecode, values)
+        buffers[name] = (typecode, memoryview(values).cast("B"))
+
+    # Section offsets are relative to the (8-byte aligned) end of the header
+    sections = {}
+    position = 0
+    for name, (typecode, buffer) in buffers.items():
+        sections[name] = [position, len(buffer), typecode]
+        position = _align(position + len(buffer))
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "sections": sections
+    }).encode("utf-8")
+
+    path = store_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<q", len(header)))
+        f.write(header)
+        f.write(bytes(_align(f.tell()) - f.tell()))
+        for name, (typecode, buffer) in buffers.items():
+            f.write(buffer)
+            f.write(bytes(_align(len(buffer)) - len(buffer)))
+    os.replace(temporary, path)
+
+
+def read_store(directory):
+    """
+    Maps the store of `directory` into a LinkStore, or returns None if
+    there is no usable store.
+    """
+    try:
+        f = open(store_path(directory), "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        header_length, = struct.unpack("<q", f.read(8))
+        header = json.loads(f.read(header_length))
+        if header["version"] != VERSION or header["byteorder"] != sys.byteorder:
+            return None
+        base = _align(len(MAGIC) + 8 + header_length)
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    sections = {}
+    for name, (offset, length, typecode) in header["sections"].items():
+        section = view[base + offset:base + offset + length]
+        sections[name] = section if typecode == "B" else section.cast(typecode)
+
+    names, outside_names = (
+        StringTable(sections[f"{name}.offsets"], sections[f"{name}.data"])
+        for name in STRING_TABLES
+    )
+    graph = LinkGraph(names, sections["offsets"], sections["links"],
+                      (sections["in_offsets"], sections["in_sources"]))
+    return LinkStore(graph, outside_names, sections["outside_offsets"],
+                     sections["outside_links"], sections["mtimes"], sections["sizes"])
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python linkstore.py corpus [--workers W] [--rebuild]")
+    parser.add_argument("corpus")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the existing store")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(store_path(args.corpus)):
+        os.remove(store_path(args.corpus))
+    stats = {}
+    start = time.perf_counter()
+    graph = load(args.corpus, args.workers, stats)
+    elapsed = time.perf_counter() - start
+    print(f"{len(graph)} pages, {len(graph.links)} links in {elapsed * 1000:.1f} ms "
+          f"({stats['reused']} reused, {stats['parsed']} parsed, {stats['removed']} removed)")
+
+
+if __name__ == "__main__":
+    main()
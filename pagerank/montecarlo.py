@@ -0,0 +1,225 @@
+"""
+Monte Carlo PageRank from many short random walks.
+
+`monte_carlo` starts `walks` walks at every page (the "complete path"
+estimator of Avrachenkov et al.): a walk visits its page, then stops
+with probability 1 - damping or moves on, following a random link or,
+from a page without links, jumping to any page. A round of walks, one
+started at every page, visits page j n * PageRank(j) / (1 - damping)
+times on average, so (1 - damping) / n times its visits in a round is an
+unbiased estimate of its PageRank. (A page's share of a round's visits
+is not: dividing by the random round total biases it.)
+
+Walks are grouped in rounds, each starting one walk at every page, and
+rounds are split into chunks of pages handed to a multiprocessing pool
+whose workers read the graph's CSR arrays from shared memory. Every
+(round, chunk) task seeds its own random.Random from the seed, round and
+chunk, so results do not depend on the number of workers. Each round
+is an independent estimate of the ranks, so the spread between rounds
+gives a standard error for the result, which shrinks like
+1 / sqrt(walks).
+
+Usage: python montecarlo.py corpus [--walks R ...] [--workers W] [--seed S]
+"""
+
+import argparse
+import array
+import collections
+import math
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+import linkstore
+from linkgraph import power_iteration
+
+# Pages whose walks form one pool task
+CHUNK_SIZE = 4096
+
+# CSR arrays of a LinkGraph needed by the walks, with their typecodes
+SHARED_ARRAYS = (("offsets", "q"), ("links", "i"))
+
+# Arrays attached by each pool worker
+_shared = None
+
+
+class MonteCarloResult():
+    """
+    Ranks estimated by monte_carlo, with the standard error of every
+    rank and totals over the whole run.
+    """
+
+    def __init__(self, ranks, errors, walks, visits, elapsed):
+        self.ranks = ranks
+        self.errors = errors
+        self.walks = walks
+        self.visits = visits
+        self.elapsed = elapsed
+
+    @property
+    def max_error(self):
+        return max(self.errors, default=0.0)
+
+    @property
+    def l1_error(self):
+        return sum(self.errors)
+
+    def as_dict(self):
+        return {
+            "walks": self.walks,
+            "visits": self.visits,
+            "max_error": self.max_error,
+            "l1_error": self.l1_error,
+            "elapsed": self.elapsed
+        }
+
+
+def walk_counts(offsets, links, damping, start, end, rng):
+    """
+    Starts one walk at each page in range(start, end) and returns a
+    Counter of the visits to every page reached.
+    """
+    n = len(offsets) - 1
+    visited = array.array("i")
+    visit = visited.append
+    uniform = rng.random
+    for page in range(start, end):
+        while True:
+            visit(page)
+            if uniform() >= damping:
+                break
+            first = offsets[page]
+            degree = offsets[page + 1] - first
+            if degree:
+                page = links[first + int(uniform() * degree)]
+            else:
+                page = int(uniform() * n)
+    return collections.Counter(visited)
+
+
+def task_rng(seed, repetition, chunk):
+    """
+    Returns the random stream of the task running round `repetition` of
+    `chunk` in a run seeded with `seed`.
+    """
+    return random.Random(f"{seed}:{repetition}:{chunk}")
+
+
+def monte_carlo(graph, damping, walks=10, workers=None, seed=0, chunk_size=CHUNK_SIZE):
+    """
+    Estimates the PageRank of `graph` from `walks` walks per page, run
+    by `workers` processes (one per CPU by default, none when 1), and
+    returns a MonteCarloResult.
+    """
+    began = time.perf_counter()
+    n = len(graph)
+    chunks = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+    tasks = [
+        (damping, start, end, seed, repetition, chunk)
+        for repetition in range(walks)
+        for chunk, (start, end) in enumerate(chunks)
+    ]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        results = (_run_task(task, graph.offsets, graph.links) for task in tasks)
+        return _combine(n, damping, walks, len(chunks), results, began)
+    blocks = []
+    try:
+        specs = []
+        for name, typecode in SHARED_ARRAYS:
+            data = memoryview(getattr(graph, name)).cast("B")
+            block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+            blocks.append(block)
+            block.buf[:len(data)] = data
+            specs.append((block.name, len(data), typecode))
+        with multiprocessing.Pool(workers, initializer=_attach, initargs=(specs,)) as pool:
+            # Tasks come back in order, so each round's chunks arrive together
+            return _combine(n, damping, walks, len(chunks),
+                            pool.imap(_run_shared_task, tasks), began)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _combine(n, damping, walks, chunks_per_round, results, began):
+    """
+    Merges task visit counts into per-round estimates and returns their
+    mean and standard error as a MonteCarloResult.
+    """
+    scale = (1 - damping) / n if n else 0.0
+    # Running sums of the per-round estimates and of their squares
+    sums = [0.0] * n
+    squares = [0.0] * n
+    visits = 0
+    round_visits = [0] * n
+    for i, counts in enumerate(results, 1):
+        for page, count in counts.items():
+            round_visits[page] += count
+        if i % chunks_per_round:
+            continue
+        visits += sum(round_visits)
+        estimate = [count * scale for count in round_visits]
+        sums = list(map(float.__add__, sums, estimate))
+        squares = [square + value * value for square, value in zip(squares, estimate)]
+        round_visits = [0] * n
+
+    ranks = [value / walks for value in sums] if walks else [0.0] * n
+    if walks > 1:
+        errors = [
+            math.sqrt(max(square / walks - mean * mean, 0.0) / (walks - 1))
+            for square, mean in zip(squares, ranks)
+        ]
+    else:
+        errors = [math.inf] * n
+    return MonteCarloResult(ranks, errors, walks * n, visits, time.perf_counter() - began)
+
+
+def _run_task(task, offsets, links):
+    damping, start, end, seed, repetition, chunk = task
+    return walk_counts(offsets, links, damping, start, end, task_rng(seed, repetition, chunk))
+
+
+def _attach(specs):
+    """
+    Pool initializer: maps the shared CSR arrays into this worker.
+    """
+    global _shared
+    _shared = []
+    for name, length, typecode in specs:
+        block = shared_memory.SharedMemory(name=name)
+        _shared.append((block, block.buf[:length].cast(typecode)))
+
+
+def _run_shared_task(task):
+    return _run_task(task, *(view for _, view in _shared))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python montecarlo.py corpus [--walks R ...] [--workers W] [--seed S]")
+    parser.add_argument("corpus")
+    parser.add_argument("--walks", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="walks per page to compare")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--damping", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    graph = linkstore.load(args.corpus)
+    exact = power_iteration(graph, args.damping, 1e-12, "l1")
+    print(f"{len(graph)} pages, {len(graph.links)} links")
+    for walks in args.walks:
+        result = monte_carlo(graph, args.damping, walks, args.workers, args.seed)
+        actual = max(abs(rank - value) for rank, value in zip(result.ranks, exact))
+        print(f"  {walks:>5} walks/page: {result.elapsed * 1000:>9.1f} ms, "
+              f"estimated max error {result.max_error:.2e}, actual {actual:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,61 @@
-import os
+import argparse
 import random
-import re
-import sys
-import math
+
+import linkstore
+from crawler import crawl_graph
+from linkgraph import MAX_ITERATIONS, NORMS, ConvergenceStats, LinkGraph
+from montecarlo import monte_carlo
+from sampling import RandomSurfer
+from solvers import SOLVERS
 
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        usage="python pagerank.py corpus [--workers W] [--no-store] [--tolerance T] "
+              "[--method METHOD] [--norm {max,l1}] [--max-iterations N] [--trace] [--walks R]")
+    parser.add_argument("corpus")
+    parser.add_argument("--workers", type=int, help="crawl with W processes (default: one per CPU)")
+    parser.add_argument("--no-store", action="store_true",
+                        help=f"crawl everything, without reading or writing corpus/{linkstore.FILENAME}")
+    parser.add_argument("--method", choices=SOLVERS, default="power",
+                        help="solver used for the iterative results")
+    parser.add_argument("--tolerance", type=float, default=0.001,
+                        help="stop iterating once the change is within T")
+    parser.add_argument("--norm", choices=NORMS, default="max",
+                        help="how the change between iterations is measured")
+    parser.add_argument("--max-iterations", type=int, default=MAX_ITERATIONS)
+    parser.add_argument("--trace", action="store_true",
+                        help="print the residual and time of every iteration")
+    parser.add_argument("--walks", type=int,
+                        help="also estimate PageRank from R short walks per page (see montecarlo.py)")
+    args = parser.parse_args()
+
+    if args.no_store:
+        corpus = crawl_graph(args.corpus, args.workers)
+    else:
+        corpus = linkstore.load(args.corpus, args.workers)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+    stats = ConvergenceStats()
+    ranks = rank(corpus, DAMPING, args.method, args.tolerance, args.norm, args.max_iterations, stats)
+    print(f"PageRank Results from Iteration ({args.method})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    outcome = "converged" if stats.converged else "stopped at the iteration cap"
+    print(f"{stats.iterations} iterations in {stats.elapsed * 1000:.3f} ms, {outcome}")
+    if args.trace:
+        for i, (residual, elapsed) in enumerate(zip(stats.residuals, stats.times), 1):
+            print(f"  {i}: {args.norm} residual {residual:.3e}, {elapsed * 1000:.3f} ms")
+    if args.walks:
+        result = monte_carlo(corpus, DAMPING, args.walks, args.workers)
+        print(f"PageRank Results from Monte Carlo ({args.walks} walks per page)")
+        for page, value, error in sorted(zip(corpus.names, result.ranks, result.errors)):
+            print(f"  {page}: {value:.4f} (± {error:.4f})")
     
 
 def crawl(directory):
@@ -28,25 +64,8 @@ def crawl(directory):
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
     """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
-
-    return pages
+    #files are parsed in a process pool straight into a LinkGraph (see crawler.py)
+    return crawl_graph(directory).to_corpus()
 
 
 def transition_model(corpus, page, damping_factor):
@@ -89,86 +108,57 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    spagerank = {}
-    current_page = random.choice(list(corpus.keys()))
-    tm = transition_model(corpus,current_page,damping_factor)
-    
-    for page in corpus:
-        spagerank[page] = 0
-    
-    #for the first page
-    spagerank[current_page] += 1
-    
-
-    #loop for n times
-    for i in range(n-1):
-        current_page = choose(tm)
-        spagerank[current_page] += 1
-
+    #the surfer moves from the page it is on, building each page's alias table on first visit
+    graph = _as_graph(corpus)
+    surfer = RandomSurfer(graph, damping_factor)
+    visits = surfer.walk(n)
 
     #take the proportion of number of times / n
-    for page in spagerank:
-        spagerank[page] = spagerank[page] / n
-    
-    
+    spagerank = {}
+    for page, count in zip(graph.names, visits):
+        spagerank[page] = count / n
+
     return spagerank
-    
-    
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, tolerance=0.001, norm="max",
+                     max_iterations=MAX_ITERATIONS, stats=None):
     """
     Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    PageRank values until convergence: until the `norm` ("max" or "l1")
+    of the change over all pages is at most `tolerance`, or for at most
+    `max_iterations` iterations. `stats`, a ConvergenceStats, receives
+    the residual and time of every iteration.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    ipagerank = {}
-    ipagerank_old = {}
-    N = len(corpus)
-    
-    #start with pagerank value for each page 1/N
-    for page in corpus:
-        ipagerank[page] = 1 / N
-        ipagerank_old[page] = 1 / N
+    return rank(corpus, damping_factor, "power", tolerance, norm, max_iterations, stats)
 
-    loop = True
-    
-    while loop:
-
-        for page in ipagerank:
-            ipagerank_old[page] = ipagerank[page]
-        
-        for page in ipagerank:
-            sumpr = 0
-
-
-            for page_i in corpus:
-                #calculating a page’s PageRank based on the PageRanks of all pages that link to it
-                if page in corpus[page_i]:
-                    sumpr += ipagerank_old[page_i] / len(corpus[page_i])
-                
-                #A page that has no links at all should be interpreted as having one link for every page in the corpus (including itself).
-                if len(corpus[page_i]) == 0:
-                    sumpr += ipagerank_old[page_i] / len(corpus)
 
+def rank(corpus, damping_factor, method="power", tolerance=0.001, norm="max",
+         max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Return PageRank values for each page like iterate_pagerank, computed
+    with `method`: "power", "gauss-seidel", "aitken", "quadratic" or
+    "adaptive" (see solvers.py).
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"unknown method: {method}")
+    #the link matrix is built once and each iteration is a sparse mat-vec (see linkgraph.py)
+    graph = _as_graph(corpus)
+    ranks = SOLVERS[method](graph, damping_factor, tolerance, norm, max_iterations, stats)
+    return dict(zip(graph.names, ranks))
 
-            total = (1 - damping_factor) / N + damping_factor * sumpr
 
-            ipagerank[page] = total
-        
-            
-        #This process should repeat until no PageRank value changes by more than 0.001 between the current rank values and the new rank values.
-        for page in ipagerank:
-            if math.isclose(ipagerank[page], ipagerank_old[page], abs_tol=0.001):
-                loop = False
-                
+def _as_graph(corpus):
+    #the functions above also accept a LinkGraph, so big corpora skip the dict of sets
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
 
 
-    return ipagerank
-  
 def choose(dist):
     r = random.random()
     sum = 0.0
@@ -177,7 +167,8 @@ def choose(dist):
         sum += dist[k]
         if sum > r:
             return k
-    return keys[-1]
+    #rounding can leave the sum just below r: fall back to the last key
+    return k
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,206 @@
+"""
+Constant-time sampling from discrete distributions for PageRank.
+
+An `AliasTable` (Vose's alias method) splits a distribution over n
+outcomes into n equally likely columns, each holding at most two
+outcomes: its own, kept with probability `probability[i]`, and an alias.
+Building the table takes O(n); every draw then takes one random number
+and O(1) work, however many outcomes there are.
+
+A `RandomSurfer` walks the PageRank Markov chain over a LinkGraph. The
+transition model of a page is a mixture: with probability `damping`
+follow one of its links, otherwise jump to any page uniformly (always
+for pages without links). Only the link part depends on the page, so
+each page needs an alias table over its own links alone; tables are
+built on first visit and kept in an LRU cache, bounding memory however
+long the walk.
+"""
+
+import collections
+import random
+from collections import OrderedDict
+from collections.abc import Sequence
+
+# Draws made per batch by AliasTable.counts
+CHUNK_SIZE = 1 << 16
+
+# Pages whose alias tables a RandomSurfer keeps
+CACHE_SIZE = 10000
+
+
+class AliasTable():
+    """
+    Alias table over `outcomes`, drawn with probability proportional
+    to `weights` (uniformly when no weights are given).
+    """
+
+    def __init__(self, outcomes, weights=None):
+        self.outcomes = outcomes if isinstance(outcomes, Sequence) else list(outcomes)
+        n = len(self.outcomes)
+        if n == 0:
+            raise ValueError("cannot sample from an empty distribution")
+        if weights is None:
+            # Uniform: every column keeps its own outcome
+            self.probability = [1.0] * n
+            self.alias = None
+            return
+        weights = list(weights)
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("weights must have a positive sum")
+
+        scaled = [weight * n / total for weight in weights]
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left over is 1 up to rounding and keeps probability 1
+
+    @classmethod
+    def from_distribution(cls, distribution):
+        """
+        Builds a table from a dict mapping outcomes to probabilities,
+        like the one returned by pagerank.transition_model.
+        """
+        return cls(distribution.keys(), distribution.values())
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def draw_index(self, rng=random):
+        """
+        Returns the index of a random outcome.
+        """
+        u = rng.random() * len(self.outcomes)
+        i = int(u)
+        if self.alias is None or u - i < self.probability[i]:
+            return i
+        return self.alias[i]
+
+    def draw(self, rng=random):
+        """
+        Returns a random outcome.
+        """
+        return self.outcomes[self.draw_index(rng)]
+
+    def counts(self, k, rng=random):
+        """
+        Returns a dict mapping every outcome to how many of `k`
+        independent draws picked it.
+        """
+        n = len(self.outcomes)
+        probability = self.probability
+        alias = self.alias if self.alias is not None else range(n)
+        uniform = rng.random
+        tally = collections.Counter()
+        while k > 0:
+            batch = min(k, CHUNK_SIZE)
+            k -= batch
+            draws = [uniform() * n for _ in range(batch)]
+            tally.update([
+                i if u - i < probability[i] else alias[i]
+                for u, i in zip(draws, map(int, draws))
+            ])
+        return {outcome: tally[i] for i, outcome in enumerate(self.outcomes)}
+
+
+class RandomSurfer():
+    """
+    Random walk over the pages of `graph`, a linkgraph.LinkGraph,
+    following links with probability `damping`.
+    """
+
+    def __init__(self, graph, damping, cache_size=CACHE_SIZE, rng=random):
+        self.graph = graph
+        self.damping = damping
+        self.cache_size = cache_size
+        self.rng = rng
+        self.tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _table(self, page):
+        """
+        Returns the alias table over the links of `page`, or None if it
+        has none.
+        """
+        tables = self.tables
+        if page in tables:
+            self.hits += 1
+            tables.move_to_end(page)
+            return tables[page]
+        self.misses += 1
+        links = self.graph.links_of(page)
+        # Links are unweighted, so the table is uniform over them
+        table = AliasTable(links) if links else None
+        tables[page] = table
+        if len(tables) > self.cache_size:
+            tables.popitem(last=False)
+            self.evictions += 1
+        return table
+
+    def step(self, page):
+        """
+        Returns the page visited after `page`.
+        """
+        table = self._table(page)
+        if table is None or self.rng.random() >= self.damping:
+            return self.rng.randrange(len(self.graph))
+        return table.draw(self.rng)
+
+    def walk(self, steps, start=None):
+        """
+        Visits `steps` pages, starting at `start` (a random page by
+        default), and returns how many times each page was visited, as
+        a list indexed by page.
+        """
+        n = len(self.graph)
+        visits = [0] * n
+        if steps <= 0:
+            return visits
+        page = self.rng.randrange(n) if start is None else start
+        visits[page] += 1
+
+        # step() inlined, with cache hits handled here and misses by _table
+        tables = self.tables
+        uniform = self.rng.random
+        damping = self.damping
+        hits = 0
+        for _ in range(steps - 1):
+            table = tables.get(page, tables)
+            if table is tables:
+                table = self._table(page)
+            else:
+                hits += 1
+                tables.move_to_end(page)
+            if table is None or uniform() >= damping:
+                page = int(uniform() * n)
+            elif table.alias is None:
+                outcomes = table.outcomes
+                page = outcomes[int(uniform() * len(outcomes))]
+            else:
+                page = table.outcomes[table.draw_index(self.rng)]
+            visits[page] += 1
+        self.hits += hits
+        return visits
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "tables": len(self.tables),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }